@@ -0,0 +1,117 @@
+'''
+18 October 2026
+
+This script computes association scores for all noun-verb pairs in the
+noun-verb bigram file and stores them as additional columns next to the
+bigram counts, so that the verb frame search of the noun frequency tool can
+rank and threshold its results by association strength instead of by raw
+counts (which favour high-frequency nouns).
+
+Marginal frequencies are the summed counts of each noun and each verb in
+the bigram file, and N is the sum of all bigram counts. For every pair with
+observed count O, noun marginal R and verb marginal C:
+
+* PMI (pointwise mutual information): log2(O / E) with E = R * C / N
+* log-Dice: 14 + log2(2 * O / (R + C)), independent of the corpus size
+* G2 (log-likelihood): 2 * sum(O_ij * ln(O_ij / E_ij)) over the 2x2
+  contingency table, negative if the pair occurs less often than expected
+
+All scores are computed on whole arrays at once with numpy.
+
+Output columns: count, noun, NOUN, verb, VERB, pmi, logdice, g2
+
+USAGE: python bigram_association.py [<bigramfile> [<outputfile>]]
+
+By default, the scores are added to bigrams_noun_verb_freq2+.tsv in place.
+Rerun the script after adding bigrams with bigram_extractor_manual.py.
+
+'''
+
+import sys
+import numpy as np
+from corpus_io import open_corpus, atomic_write
+
+
+def read_bigrams(filename):
+    '''
+    Reads the noun-verb bigram file (existing score columns are dropped)
+    '''
+    print('Reading in noun-verb bigrams...')
+    bigrams = []
+    with open_corpus(filename) as F:
+        for line in F:
+            line = line.rstrip('\n').split('\t')
+            if len(line) >= 5:
+                bigrams.append(line[:5])
+    print('Read {} bigrams.'.format(len(bigrams)))
+    return bigrams
+
+def association_scores(bigrams):
+    '''
+    Computes the PMI, log-Dice and G2 scores of all bigrams.
+    Returns three numpy arrays aligned with the list of bigrams.
+    '''
+    counts = np.array([int(bigram[0]) for bigram in bigrams], dtype=np.float64)
+    # Marginal frequencies of the nouns and verbs
+    _, noun_ids = np.unique([bigram[1].title() for bigram in bigrams],
+                            return_inverse=True)
+    _, verb_ids = np.unique([bigram[3] for bigram in bigrams],
+                            return_inverse=True)
+    noun_marginals = np.bincount(noun_ids, weights=counts)[noun_ids]
+    verb_marginals = np.bincount(verb_ids, weights=counts)[verb_ids]
+    total = counts.sum()
+
+    expected = noun_marginals * verb_marginals / total
+    pmi = np.log2(counts / expected)
+    logdice = 14 + np.log2(2 * counts / (noun_marginals + verb_marginals))
+
+    # Observed and expected frequencies of the 2x2 contingency table
+    observed = [counts,
+                noun_marginals - counts,
+                verb_marginals - counts,
+                total - noun_marginals - verb_marginals + counts]
+    expected = [expected,
+                noun_marginals * (total - verb_marginals) / total,
+                (total - noun_marginals) * verb_marginals / total,
+                (total - noun_marginals) * (total - verb_marginals) / total]
+    g2 = np.zeros_like(counts)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        for o, e in zip(observed, expected):
+            g2 += np.where(o > 0, o * np.log(o / e), 0.0)
+    g2 = 2 * g2 * np.sign(counts - expected[0])
+
+    return pmi, logdice, g2
+
+def write_scores_to_file(bigrams, scores, outfilename):
+    '''
+    Writes the bigrams with their association scores to an output file.
+    The file is written under a temporary name and then renamed, so that the
+    bigram file is never left half-written.
+    '''
+    print('\nWriting bigrams with association scores to file (filename: {})'\
+          .format(outfilename))
+    atomic_write(outfilename, ('\t'.join(bigram) +
+                               '\t{:.4f}\t{:.4f}\t{:.4f}\n'\
+                               .format(pmi, logdice, g2)
+                               for bigram, pmi, logdice, g2
+                               in zip(bigrams, *scores)))
+    print('\nDone.\n')
+    return
+
+if __name__ == '__main__':
+
+    bigramfile = 'bigrams_noun_verb_freq2+.tsv'
+    if len(sys.argv) > 3:
+        print('\nUSAGE: python bigram_association.py '
+              '[<bigramfile> [<outputfile>]]\n')
+        sys.exit()
+    if len(sys.argv) > 1:
+        bigramfile = sys.argv[1]
+    outfilename = bigramfile
+    if len(sys.argv) > 2:
+        outfilename = sys.argv[2]
+
+    bigrams = read_bigrams(bigramfile)
+    print('Computing association scores...')
+    scores = association_scores(bigrams)
+    write_scores_to_file(bigrams, scores, outfilename)
@@ -13,7 +13,18 @@ the bigram is added to the final list of NOUN-VERB bigrams.
 
 This version uses a cutoff value to exclude very rare bigrams of total count 1.
 
-USAGE: python bigram_extractor.py
+The bigram list may be compressed (gzip, bzip2, xz or zstd); it is then
+decompressed on the fly (see corpus_io.py). By default, the bigram list
+de.lemma.bigrams.utf8.txt (or its compressed version, e.g.
+de.lemma.bigrams.utf8.txt.gz) is read.
+
+The bigrams are written to the output file during the extraction, and the
+progress is saved to a checkpoint file (<outputfile>.checkpoint) at regular
+intervals and on Ctrl-C. An interrupted extraction can be continued from
+its last checkpoint with --resume. An interrupted extraction exits with
+status 130.
+
+USAGE: python bigram_extractor.py [<bigramlist> [<outputfile>]] [--resume]
 
 For POS tagging, install the German model for spaCy with:
 python -m spacy download de_core_news_sm
@@ -39,24 +50,102 @@ SpaCy POS-tag set:
 
 '''
 
+import json
+import os
+import sys
 import spacy
+from corpus_io import open_corpus, atomic_write, find_corpus
+
+BIGRAM_LIST = 'de.lemma.bigrams.utf8.txt'  # lemmatized deWaC bigram list
+CHECKPOINT_EVERY = 100000  # lines between two checkpoints
+
+
+def checkpoint_filename(outfilename):
+    '''
+    Returns the name of the checkpoint file belonging to an output file
+    '''
+    return outfilename + '.checkpoint'
+
+def write_checkpoint(outfilename, output, state):
+    '''
+    Flushes the output file to disk and records the extraction state
+    (input byte offset, processed lines, output size, ...) in the
+    checkpoint file
+    '''
+    output.flush()
+    os.fsync(output.fileno())
+    atomic_write(checkpoint_filename(outfilename), [json.dumps(state)])
+    return
 
-def get_verb_bigrams(filename, cutoff_value, verb):
+def read_checkpoint(outfilename, filename, cutoff_value, verb):
+    '''
+    Returns the state saved in the checkpoint file of an output file,
+    or None if there is no checkpoint for this extraction (or if the output
+    file is shorter than recorded in the checkpoint)
+    '''
+    try:
+        with open(checkpoint_filename(outfilename), 'r', encoding='utf-8') as F:
+            state = json.load(F)
+    except (OSError, ValueError):
+        return None
+    if not os.path.exists(outfilename):
+        return None
+    if (state['filename'], state['cutoff_value'], state['verb']) != \
+       (filename, cutoff_value, verb):
+        return None
+    if state['output_size'] > os.path.getsize(outfilename):
+        return None
+    return state
+
+def get_verb_bigrams(filename, cutoff_value, verb, outfilename, resume=False):
     '''
     Extracts bigrams from the deWaC corpus lemmatized bigram list.
     Keeps only bigrams that end with a verb and start with a noun.
     If a cutoff_value larger than 0 is given as input, bigrams whose count
     in the corpus is equal to or lower than this cutoff value will be skipped.
+    The bigrams are written to the output file while the extraction runs,
+    and a checkpoint is saved every CHECKPOINT_EVERY lines. With resume=True,
+    an interrupted extraction continues from its last checkpoint.
+    Returns the number of bigrams found.
     '''
+    state = None
+    if resume:
+        state = read_checkpoint(outfilename, filename, cutoff_value, verb)
+        if state is None:
+            print('No checkpoint found for {}, starting from the beginning.'\
+                  .format(outfilename))
+    if state is None:
+        state = {'filename': filename, 'cutoff_value': cutoff_value,
+                 'verb': verb, 'offset': 0, 'lines': 0, 'found': 0,
+                 'output_size': 0}
+        # Remove the checkpoint of an earlier run, which no longer matches
+        # the emptied output file
+        if os.path.exists(checkpoint_filename(outfilename)):
+            os.remove(checkpoint_filename(outfilename))
+        open(outfilename, 'w').close()
+    else:
+        print('Resuming from checkpoint (processed {} bigrams)'\
+              .format(state['lines']))
     print('Starting bigram extraction...')
     print('(Extracting bigrams with a frequency of more than {})'\
           .format(cutoff_value))
     nlp = spacy.load("de_core_news_sm", disable=["tok2vec", "parser", \
                      "attribute_ruler", "lemmatizer", "ner"])
-    with open(filename, 'r', encoding='utf-8') as F:
-        i = 0
+    with open_corpus(filename, 'rb') as F, open(outfilename, 'r+b') as output:
+        # Continue where the last checkpoint left off
+        output_size = state['output_size']
+        found = state['found']
+        output.truncate(output_size)
+        output.seek(output_size)
+        if state['offset'] > 0:
+            if F.seekable():
+                F.seek(state['offset'])
+            else:  # compressed input: skip the processed part
+                skip = state['offset']
+                while skip > 0:
+                    skip -= len(F.read(min(skip, 1 << 20)))
+        i = state['lines']
         keep_tags = ['AUX', 'VERB']
-        keep_bigrams = []
         cutoff_n = {'1': 35833352,
                     '2': 21349329,
                     '3': 15635096,
@@ -66,65 +155,83 @@ def get_verb_bigrams(filename, cutoff_value, verb):
         n = 100852376  # total number of lines in bigram lemma file
         if cutoff_value in cutoff_n.keys():
             n = cutoff_n[cutoff_value]
-        for line in F:
-            i += 1
-            if i % 1000 == 0:
-                print(' Progress: {:2.2%} (processed {} bigrams)'\
-                      .format(i/n, i), end='\r')
-            line = line.split()
-            if len(line) >= 3:  # to avoid errors in case of incomplete lines
-                bigram_count = line[0]
-                lemma1 = line[1]
-                lemma2 = line[2]
-                if bigram_count == cutoff_value:
-                    break
-                # Alternatively, only process bigrams with this count:
-                # if not bigram_count == cutoff_value:
-                #     continue
-                if verb == None:
-                    if lemma2[-1] == 'n':  # superficial check for verb
-                        lemma2_analysis = nlp(lemma2)[0]
-                        lemma2_pos = lemma2_analysis.pos_
-                        if lemma2_pos in keep_tags:
+        try:
+            for line in F:
+                i += 1
+                offset = state['offset'] + len(line)
+                if i % 1000 == 0:
+                    print(' Progress: {:2.2%} (processed {} bigrams)'\
+                          .format(i/n, i), end='\r')
+                line = line.decode('utf-8').split()
+                if len(line) >= 3:  # to avoid errors in case of incomplete lines
+                    bigram_count = line[0]
+                    lemma1 = line[1]
+                    lemma2 = line[2]
+                    if bigram_count == cutoff_value:
+                        break
+                    # Alternatively, only process bigrams with this count:
+                    # if not bigram_count == cutoff_value:
+                    #     continue
+                    bigram = None
+                    if verb == None:
+                        if lemma2[-1] == 'n':  # superficial check for verb
+                            lemma2_analysis = nlp(lemma2)[0]
+                            lemma2_pos = lemma2_analysis.pos_
+                            if lemma2_pos in keep_tags:
+                                lemma1_analysis = nlp(lemma1)[0]
+                                lemma1_pos = lemma1_analysis.pos_
+                                if lemma1_pos == 'NOUN':
+                                    bigram = (bigram_count, lemma1, lemma1_pos,
+                                              lemma2, lemma2_pos)
+                    else:
+                        if lemma2 == verb:
+                            lemma2_pos = 'VERB'
                             lemma1_analysis = nlp(lemma1)[0]
                             lemma1_pos = lemma1_analysis.pos_
                             if lemma1_pos == 'NOUN':
-                                keep_bigrams.append((bigram_count,
-                                                     lemma1, lemma1_pos,
-                                                     lemma2, lemma2_pos))
-                else:
-                    if lemma2 == verb:
-                        lemma2_pos = 'VERB'
-                        lemma1_analysis = nlp(lemma1)[0]
-                        lemma1_pos = lemma1_analysis.pos_
-                        if lemma1_pos == 'NOUN':
-                            keep_bigrams.append((bigram_count,
-                                                 lemma1, lemma1_pos,
-                                                 lemma2, lemma2_pos))
+                                bigram = (bigram_count, lemma1, lemma1_pos,
+                                          lemma2, lemma2_pos)
+                    if bigram is not None:
+                        data = ('\t'.join(str(el) for el in bigram)
+                                + '\n').encode('utf-8')
+                        output.write(data)
+                        output_size += len(data)
+                        found += 1
+                # Update the whole state at once, so that an interruption
+                # never leaves it half-updated
+                state.update(offset=offset, lines=i, found=found,
+                             output_size=output_size)
+                if i % CHECKPOINT_EVERY == 0:
+                    write_checkpoint(outfilename, output, state)
+        except KeyboardInterrupt:
+            write_checkpoint(outfilename, output, state)
+            print('\n\nInterrupted after {} lines. To continue, run the '
+                  'extraction again with --resume.\n'.format(state['lines']))
+            sys.exit(130)
+    if os.path.exists(checkpoint_filename(outfilename)):
+        os.remove(checkpoint_filename(outfilename))
     print('\n\nProcessed all {} lines.'.format(i))
-    print('\nFound {} NOUN-VERB bigrams.'.format(len(keep_bigrams)))
-    return keep_bigrams
-
-def write_bigrams_to_file(bigrams, outfilename):
-    '''
-    Writes the extracted noun-verb bigrams to an output file.
-    '''
-    print('\nWriting noun-verb bigrams to file (filename: {})'\
-          .format(outfilename))
-    output = open(outfilename, 'w', encoding='utf8')
-    for line in bigrams:
-        output.write('\t'.join(str(el) for el in line) + '\n')
-    output.close()
-    print('\nDone.\n')
-    return
+    print('\nFound {} NOUN-VERB bigrams.'.format(found))
+    return found
 
 if __name__ == '__main__':
 
+    # Continue an interrupted extraction from its last checkpoint
+    resume = '--resume' in sys.argv[1:]
+    args = [arg for arg in sys.argv[1:] if arg != '--resume']
+    if len(args) > 2:
+        print('\nUSAGE: python bigram_extractor.py '
+              '[<bigramlist> [<outputfile>]] [--resume]\n')
+        sys.exit()
+    bigramlist = find_corpus(BIGRAM_LIST)
+    outfilename = 'bigrams_noun_verb.tsv'
+    if len(args) > 0:
+        bigramlist = args[0]
+    if len(args) > 1:
+        outfilename = args[1]
+
     # Extract bigrams up to (but excluding) a certain minimum frequency count
+    # and write them to the output file while the extraction runs
     cutoff_value = '1'  # '1' will process bigrams with a count > 1
     verb = None  # verbs can be entered in the extension file to this script
-    bigrams = get_verb_bigrams('de.lemma.bigrams.utf8.txt', cutoff_value, verb)
-
-    # Write extracted bigrams to file
-    outfilename = 'bigrams_noun_verb.tsv'
-    write_bigrams_to_file(bigrams, outfilename)
+    get_verb_bigrams(bigramlist, cutoff_value, verb, outfilename, resume)
@@ -13,22 +13,30 @@ noun-verb bigram file.
 If the verb is not found, the user can choose in step 2 whether or not to
 append bigrams for this verb to the noun-verb bigram file.
 
-USAGE: python bigram_extractor_manual.py <yourverb>
+The new bigrams are first extracted to a separate file (resumable with
+--resume, see bigram_extractor.py) and then appended to the bigram file
+in one atomic step, so an interruption can never corrupt the bigram file.
 
-'''
+USAGE: python bigram_extractor_manual.py <yourverb> [<bigramlist>] [--resume]
 
-import sys
-from bigram_extractor import get_verb_bigrams
+By default, the bigrams are extracted from de.lemma.bigrams.utf8.txt (or its
+compressed version, e.g. de.lemma.bigrams.utf8.txt.gz).
 
+'''
 
+import os
 import sys
+from bigram_extractor import get_verb_bigrams, checkpoint_filename, \
+    BIGRAM_LIST
+from corpus_io import open_corpus, atomic_write, find_corpus
+
 
 def verb_exists(bigramfile, verb):
     '''
     Checks whether the verb is already present in the bigram file
     '''
     print('Searching for bigrams with the verb: {}'.format(verb))
-    with open(bigramfile, 'r', encoding='utf-8') as F:
+    with open_corpus(bigramfile) as F:
         i = 0
         n_bigrams = 3306296  # number of lines in original bigram file
         for line in F:
@@ -42,7 +50,13 @@ def verb_exists(bigramfile, verb):
                 return True
     return False
 
-def add_bigrams_to_file(verb, bigramfile):
+def add_bigrams_to_file(verb, bigramfile, resume=False, bigramlist=None):
+    '''
+    Extracts the bigrams of a verb from the bigram list and appends them
+    to the bigram file
+    '''
+    if bigramlist is None:
+        bigramlist = find_corpus(BIGRAM_LIST)
     cutoff = '1'  # '0' will process all bigrams
     print('The default cutoff value for the bigram frequency is {}.'\
           .format(cutoff))
@@ -55,32 +69,48 @@ def add_bigrams_to_file(verb, bigramfile):
           .format(verb, cutoff))
 
     # Extract bigrams up to (but excluding) a certain min frequency count
-    bigrams = get_verb_bigrams('de.lemma.bigrams.utf8.txt', cutoff, verb)
+    verbfile = 'bigrams_noun_{}.tsv'.format(verb)
+    get_verb_bigrams(bigramlist, cutoff, verb, verbfile, resume)
+
+    # Only append the bigrams of a completed extraction
+    if os.path.exists(checkpoint_filename(verbfile)):
+        print('The extraction for {} is not complete; the bigram file was '
+              'not changed. To continue, run the script again with --resume.'\
+              .format(verb))
+        return
 
     # Append the new bigrams to the bigrams file
+    with open(verbfile, 'r', encoding='utf-8') as F:
+        bigrams = [line.rstrip('\n').split('\t') for line in F]
     file_appender(bigramfile, bigrams)
+    os.remove(verbfile)
 
     return
 
 def file_appender(filename, newlines):
     '''
-    Appends lines to the end of a file
+    Appends lines to the end of a file (atomically: the file is only replaced
+    once the extended copy is completely written)
     '''
     print('Adding the new bigrams to the bigram file...')
-    with open(filename, 'a') as f:
-        for line in newlines:
-            f.write('\t'.join(str(el) for el in line) + '\n')
+    atomic_write(filename, ('\t'.join(str(el) for el in line) + '\n'
+                            for line in newlines), append=True)
     print('Bigrams added.\n')
     return
 
 if __name__ == '__main__':
 
-    # Check presence of command line argument
-    try:
-        verb = sys.argv[1].strip()
-    except:
-        print('\nUSAGE: python bigram_extractor_manual.py <yourverb>\n')
+    # Check presence of command line arguments
+    resume = '--resume' in sys.argv[1:]
+    args = [arg for arg in sys.argv[1:] if arg != '--resume']
+    if len(args) not in (1, 2):
+        print('\nUSAGE: python bigram_extractor_manual.py <yourverb> '
+              '[<bigramlist>] [--resume]\n')
         sys.exit()
+    verb = args[0].strip()
+    bigramlist = find_corpus(BIGRAM_LIST)
+    if len(args) == 2:
+        bigramlist = args[1]
 
     # Terminal colors
     red_col = '\u001b[31;1m'    # bright red
@@ -104,6 +134,6 @@ if __name__ == '__main__':
     print('(y/n)')
     choice = input().strip()
     if choice.lower() == 'y':
-        add_bigrams_to_file(verb, bigramfile)
+        add_bigrams_to_file(verb, bigramfile, resume, bigramlist)
     else:
         print('Not adding bigrams.\n')
@@ -0,0 +1,219 @@
+'''
+18 October 2026
+
+Reading of (possibly compressed) corpus files, and atomic writing of
+output files.
+
+open_corpus() opens plain text files as well as gzip, bzip2, xz and zstd
+compressed files, so that the large corpus dumps (e.g.
+sorted.de.word.unigrams.utf8.gz, de.lemma.bigrams.utf8.txt.xz) do not have
+to be decompressed on disk first. The compression format is detected from
+the first bytes of the file. find_corpus() finds the compressed version of
+a default corpus file name if the plain file is not present.
+
+Decompression runs in parallel to the parsing of the lines: if a suitable
+command line decompressor is installed (pigz, lbzip2, pbzip2, xz or zstd),
+it runs as a separate process; otherwise, the file is decompressed with the
+Python modules (gzip, bz2, lzma or the optional zstandard package) in a
+separate thread, which releases the GIL while inflating. If the
+decompression fails (e.g. for a truncated or damaged file), reading raises
+an OSError at the point where the output ends, so that a damaged file is
+never mistaken for a complete one.
+
+'''
+
+import bz2
+import gzip
+import io
+import lzma
+import os
+import shutil
+import subprocess
+import threading
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+
+# Magic bytes of the supported compression formats
+MAGIC_BYTES = {'gzip': b'\x1f\x8b',
+               'bzip2': b'BZh',
+               'xz': b'\xfd7zXZ\x00',
+               'zstd': b'\x28\xb5\x2f\xfd'}
+# Command line decompressors per format, in order of preference
+# (single-threaded gzip and bzip2 are not faster than the Python modules)
+DECOMPRESSORS = {'gzip': [['pigz', '-dc']],
+                 'bzip2': [['lbzip2', '-dc'], ['pbzip2', '-dc']],
+                 'xz': [['xz', '-dc', '-T0']],
+                 'zstd': [['zstd', '-dcq']]}
+# File name suffixes of compressed corpus files, in order of preference
+COMPRESSED_SUFFIXES = ('.gz', '.bz2', '.xz', '.zst')
+CHUNK_SIZE = 1 << 20
+
+
+def find_corpus(filename):
+    '''
+    Returns the file name if the file exists, otherwise the first existing
+    compressed version of it (e.g. de.lemma.bigrams.utf8.txt.gz), or the
+    file name itself if there is none
+    '''
+    if os.path.exists(filename):
+        return filename
+    for suffix in COMPRESSED_SUFFIXES:
+        if os.path.exists(filename + suffix):
+            return filename + suffix
+    return filename
+
+def detect_compression(filename):
+    '''
+    Returns the compression format of a file, or None for uncompressed files
+    '''
+    with open(filename, 'rb') as F:
+        start = F.read(6)
+    for compression, magic in MAGIC_BYTES.items():
+        if start.startswith(magic):
+            return compression
+    return None
+
+class DecompressedStream(io.RawIOBase):
+    '''
+    Output stream of a decompressor process or thread. At the end of the
+    output, it waits for the decompressor and raises an OSError if the
+    decompression failed; closing the stream stops the decompressor.
+    '''
+
+    def __init__(self, stream, filename, process=None, thread=None,
+                 errors=None):
+        self.stream = stream
+        self.filename = filename
+        self.process = process
+        self.thread = thread
+        self.errors = errors
+        self.finished = False
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        n = self.stream.readinto(buffer)
+        if n == 0 and len(buffer) > 0 and not self.finished:
+            self.finished = True
+            self.check()
+        return n
+
+    def check(self):
+        '''
+        Waits for the decompressor and raises an OSError if it failed
+        '''
+        if self.process is not None:
+            self.process.wait()
+            if self.process.returncode != 0:
+                raise OSError('Decompressing {} failed: {} exited with '
+                              'status {}'.format(self.filename,
+                                                 self.process.args[0],
+                                                 self.process.returncode))
+        if self.thread is not None:
+            self.thread.join()
+            if self.errors:
+                raise OSError('Decompressing {} failed: {}'\
+                              .format(self.filename, self.errors[0]))
+
+    def close(self):
+        if not self.closed:
+            self.stream.close()
+            if self.process is not None:
+                if self.process.poll() is None:  # the reader stopped early
+                    self.process.terminate()
+                self.process.wait()
+        super().close()
+
+def decompress_in_process(filename, compression):
+    '''
+    Starts a command line decompressor for the file.
+    Returns its output stream, or None if no decompressor is installed.
+    '''
+    for command in DECOMPRESSORS[compression]:
+        if shutil.which(command[0]) is not None:
+            process = subprocess.Popen(command + [filename],
+                                       stdout=subprocess.PIPE,
+                                       bufsize=CHUNK_SIZE)
+            return DecompressedStream(process.stdout, filename,
+                                      process=process)
+    return None
+
+def decompress_in_thread(filename, compression):
+    '''
+    Decompresses the file in a separate thread that writes into a pipe.
+    Returns the output stream (the reading end of the pipe).
+    '''
+    if compression == 'gzip':
+        source = gzip.open(filename, 'rb')
+    elif compression == 'bzip2':
+        source = bz2.open(filename, 'rb')
+    elif compression == 'xz':
+        source = lzma.open(filename, 'rb')
+    elif zstandard is not None:
+        source = zstandard.ZstdDecompressor().stream_reader(
+            open(filename, 'rb'), closefd=True)
+    else:
+        raise ValueError('Reading zstd files requires the zstd command '
+                         'or the zstandard package (pip install zstandard)')
+    read_end, write_end = os.pipe()
+    errors = []
+
+    def decompress():
+        try:
+            with source, open(write_end, 'wb') as output:
+                shutil.copyfileobj(source, output, CHUNK_SIZE)
+        except BrokenPipeError:
+            pass  # the reader stopped early
+        except Exception as error:
+            errors.append(error)
+
+    thread = threading.Thread(target=decompress, daemon=True)
+    thread.start()
+    return DecompressedStream(open(read_end, 'rb', buffering=CHUNK_SIZE),
+                              filename,
+                              thread=thread, errors=errors)
+
+def open_corpus(filename, mode='r', encoding='utf-8'):
+    '''
+    Opens a plain or compressed corpus file for reading,
+    in text mode ('r') or binary mode ('rb')
+    '''
+    compression = detect_compression(filename)
+    if compression is None:
+        if mode == 'rb':
+            return open(filename, 'rb')
+        return open(filename, 'r', encoding=encoding)
+    stream = decompress_in_process(filename, compression)
+    if stream is None:
+        stream = decompress_in_thread(filename, compression)
+    stream = io.BufferedReader(stream, CHUNK_SIZE)
+    if mode == 'rb':
+        return stream
+    return io.TextIOWrapper(stream, encoding=encoding)
+
+def atomic_write(filename, lines, append=False):
+    '''
+    Writes lines to a file (or appends them to the existing content) via a
+    temporary file that replaces the file only once it is complete, so that
+    an interrupted write never leaves a truncated or corrupted file behind
+    '''
+    tmpfilename = '{}.{}.tmp'.format(filename, os.getpid())
+    try:
+        with open(tmpfilename, 'wb') as output:
+            if append and os.path.exists(filename):
+                with open(filename, 'rb') as original:
+                    shutil.copyfileobj(original, output, CHUNK_SIZE)
+            for line in lines:
+                output.write(line.encode('utf-8'))
+            output.flush()
+            os.fsync(output.fileno())
+        os.replace(tmpfilename, filename)
+    finally:
+        if os.path.exists(tmpfilename):
+            os.remove(tmpfilename)
+    return
@@ -49,7 +49,63 @@ Search parameters (interactively adjustable, except for word frequency):
 
 import sys
 import os
+import math
+import threading
+from collections import OrderedDict
 from demorphy import Analyzer
+from noun_index import build_noun_index, attach_noun_index, noun_at, \
+    encode_mask, decode_mask, freq_rows, prefix_rows, suffix_rows, \
+    freq_bin_ranges, cube_count, nearest_rows, build_verb_index, \
+    attach_verb_index, verb_pairs, ASSOCIATION_MEASURES
+
+# Frequency lists of the available corpora (each produced by
+# transform_frequencies.py). The primary corpus provides the noun list and
+# the morphological analyses; the frequencies of the other corpora are only
+# loaded once a search uses them.
+CORPORA = {'dewac': 'deWaC_freqlist.tsv',
+           'sdewac': 'SdeWaC_freqlist.tsv',
+           'subtitles': 'subtitles_freqlist.tsv',
+           'inhouse': 'inhouse_freqlist.tsv'}
+PRIMARY_CORPUS = 'dewac'
+
+# Noun-verb table for the verb frame search: the NOUN-VERB bigrams of
+# bigram_extractor.py, or the verb-object pairs of verb_object_extractor.py
+BIGRAM_FILE = 'bigrams_noun_verb_freq2+.tsv'
+
+# String patterns that can restrict a search, e.g. 'prefix:ver',
+# 'suffix:ung' or 'head:haus' (compounds with the head 'haus')
+PATTERN_KINDS = ('prefix', 'suffix', 'head')
+
+# Possible values of the morphological search criteria
+POSSIBLE_GENDERS = {'fem', 'masc', 'neut'}
+POSSIBLE_CASES = {'nom', 'gen', 'dat', 'acc'}
+POSSIBLE_NUMBERS = {'sing', 'plu'}
+
+# If fewer nouns match the search criteria, relaxations are suggested
+MIN_RESULTS = 20
+
+# Nearest neighbour mode: default number of nouns, and the weights of the
+# log10 frequency and the length in the distance (with these weights, a
+# frequency ratio of 10**0.2 = 1.6 counts as much as one character)
+NEAREST_K = 20
+NEAREST_WEIGHTS = (5.0, 1.0)
+
+# Result cache: maps normalized search criteria to the matching nouns
+# (least recently used searches are evicted first)
+CACHE_SIZE = 32
+result_cache = OrderedDict()
+# Bigram cache: maps (search criteria, verb) to the bigram search results
+bigram_cache = dict()
+
+# Background loading: resources are loaded in daemon threads at startup,
+# each query waits only for the resources it actually needs
+RESOURCE_NAMES = {'analyzer': 'morphological analyzer',
+                  'nouns': 'noun frequencies',
+                  'verbs': 'noun-verb bigrams'}
+loaders = dict()      # resource name -> loading thread
+resources = dict()    # resource name -> loaded resource
+load_status = dict()  # resource name -> loading progress (0 to 1)
+load_errors = dict()  # resource name -> exception raised while loading
 
 
 def start_search():
@@ -62,6 +118,7 @@ def start_search():
     os.system('cls' if os.name == 'nt' else 'clear')  # clear terminal
 
     print('{}GERMAN NOUN FREQUENCY TOOL{}\n'.format(heading_col, reset_col))
+    print_load_status()
 
     print('{}Please enter either\n'
           '- a noun (e.g. Haus), or\n'
@@ -78,6 +135,7 @@ def start_search():
     # Differentiate between frequency and word input:
     try:
         search_freq = float(user_input)
+        target_word = None
         # Set search defaults
         genders = {'masc', 'fem', 'neut'}
         length_min = 1
@@ -105,84 +163,236 @@ def start_search():
     # Shared search defaults
     cases = {'dat', 'acc'}
     numerus = {'sing'}
+    corpora = set()
+    patterns = set()
+    nearest = None
 
-    # Print search criteria
+    # Print search criteria and customize the search until the user is done
     print('\nThe automatically defined criteria for your search are:')
-    print('\t* Search frequency:\t', end='')
-    frequency_range(search_freq)
+    criteria = (genders, cases, numerus, length_min, length_max,
+                corpora, patterns, nearest)
+    while True:
+        print_criteria(search_freq, *criteria)
+        print('{}\nPress \'c\' to change these criteria, '
+              'otherwise press Enter.{}'.format(input_col, reset_col))
+        new_criteria = search_customization(*criteria)
+        if new_criteria == criteria:
+            break
+        criteria = new_criteria
+        print('\nThe criteria for your search are now:')
+    genders, cases, numerus, length_min, length_max, corpora, patterns, \
+        nearest = criteria
+    corpus_freqs = get_corpus_search_freqs(corpora, search_freq, target_word)
+
+    # Nearest neighbour mode: the k nouns closest in frequency and length
+    if nearest is not None:
+        if target_word is not None:
+            target_length = len(target_word)
+        elif (length_min, length_max) != (1, 100):
+            target_length = (length_min + length_max) / 2
+        else:
+            target_length = None  # only the frequency counts
+        freq_list = nearest_search(search_freq, target_length, nearest,
+                                   length_min, length_max, genders, cases,
+                                   numerus, corpus_freqs, patterns,
+                                   target_word)
+        continue_options(freq_list)
+
+    # Search for similar targets
+    search_key = normalize_criteria(search_freq, length_min, length_max,
+                                    genders, cases, numerus, corpus_freqs,
+                                    patterns)
+    freq_list = main_search(search_freq, length_min, length_max,
+                            genders, cases, numerus, corpus_freqs, patterns)
+
+    continue_options(freq_list, search_key)
+
+def print_criteria(search_freq, genders, cases, numerus, length_min,
+                   length_max, corpora, patterns, nearest):
+    '''
+    Prints the search criteria together with the number of matching nouns
+    and, if too few nouns match, suggestions for relaxing the criteria
+    '''
+    if nearest is not None:
+        print('\t* Nearest neighbours:\tthe {} nouns closest to {} per '
+              'million in frequency and length'.format(nearest, search_freq))
+    else:
+        print('\t* Search frequency:\t', end='')
+        frequency_range(search_freq)
     print('\t* Word length:\t\t{} to {} characters'\
           .format(length_min, length_max))
     print('\t* Gender(s):\t\t{}'.format(', '.join(genders)))
     print('\t* Case(s):\t\t{}'.format(', '.join(cases)))
     print('\t* Numerus:\t\t{}'.format(', '.join(numerus)))
-    print('{}\nPress \'c\' to change these criteria, otherwise press Enter.{}'
-          .format(input_col, reset_col))
-    # Customize search
-    genders, cases, numerus, length_min, length_max = \
-        search_customization(genders, cases, numerus, length_min, length_max)
+    print('\t* Corpora:\t\t{}'\
+          .format(', '.join([PRIMARY_CORPUS] + sorted(corpora))))
+    if patterns:
+        print('\t* Pattern(s):\t\t{}'\
+              .format(', '.join(':'.join(p) for p in sorted(patterns))))
+    if nearest is not None:
+        return
 
-    # Search for similar targets
-    freq_list = main_search(search_freq, length_min, length_max,
-                            genders, cases, numerus)
+    # Result size preview from the count cube (no waiting for the nouns)
+    if not resource_ready('nouns'):
+        print('\n(The number of matching nouns is shown once the noun '
+              'frequencies are loaded.)')
+        return
+    n = count_matches(search_freq, length_min, length_max,
+                      genders, cases, numerus)
+    if corpora or patterns:
+        print('\n=> At most {} matching nouns (before the corpus and '
+              'pattern criteria)'.format(n))
+    else:
+        print('\n=> {} matching nouns'.format(n))
+    if n >= MIN_RESULTS:
+        return
+
+    # Suggest relaxations of the criteria
+    relaxations = []
+    for diff in (1, 2):
+        new_min = max(length_min - diff, 1)
+        new_max = min(length_max + diff, 100)
+        if (new_min, new_max) != (length_min, length_max):
+            relaxations.append(('word length {}-{}'.format(new_min, new_max),
+                                (new_min, new_max, genders, cases, numerus)))
+    if genders != POSSIBLE_GENDERS:
+        relaxations.append(('all genders', (length_min, length_max,
+                            POSSIBLE_GENDERS, cases, numerus)))
+    if cases != POSSIBLE_CASES:
+        relaxations.append(('all cases', (length_min, length_max,
+                            genders, POSSIBLE_CASES, numerus)))
+    if numerus != POSSIBLE_NUMBERS:
+        relaxations.append(('singular and plural', (length_min, length_max,
+                            genders, cases, POSSIBLE_NUMBERS)))
+    suggestions = []
+    for description, relaxed in relaxations:
+        relaxed_n = count_matches(search_freq, *relaxed)
+        if relaxed_n > n:
+            suggestions.append('{}: {} nouns'.format(description, relaxed_n))
+    if suggestions:
+        print('{}Fewer than {} nouns match. Possible relaxations:{}'\
+              .format(warn_col, MIN_RESULTS, reset_col))
+        for suggestion in suggestions:
+            print('\t- ' + suggestion)
 
-    continue_options(freq_list)
+def count_matches(search_freq, length_min, length_max, genders, cases,
+                  numerus):
+    '''
+    Returns the number of nouns matching the search criteria, looked up in
+    the count cube of the noun index (without scanning the nouns)
+    '''
+    noun_index = get_resource('nouns')
+    bin_ranges = freq_bin_ranges(frequency_intervals(search_freq))
+    return cube_count(noun_index, bin_ranges, length_min, length_max,
+                      encode_mask(noun_index, 'gender', genders),
+                      encode_mask(noun_index, 'case', cases),
+                      encode_mask(noun_index, 'numerus', numerus))
 
-def main_search(search_freq, length_min, length_max, genders, cases, numerus):
+def nearest_search(search_freq, target_length, k, length_min, length_max,
+                   genders, cases, numerus, corpus_freqs=None, patterns=None,
+                   target_word=None):
 
     '''
-    Reads the file containing the word frequencies and extracts + prints words
-    on the basis of the specified search criteria
+    Extracts + prints the k nouns closest to the search frequency (on a log
+    scale) and the target length, using the KD-tree of the noun index.
+    Nouns outside the length range, not sharing a gender, case and numerus
+    value with the criteria, outside the frequency range in the further
+    corpora or not matching the string patterns are skipped; if
+    target_length is None, only the frequency is taken into account.
     '''
 
-    print('\nSearching for nouns...')
+    noun_index = get_resource('nouns')
+    if noun_index is None:
+        sys.exit()
+    corpus_columns = get_corpus_columns(corpus_freqs)
 
-    freq_dict = dict()
-    i = 0
-    n = len(noun_freq_dict.keys())
-    for freq, noundict in noun_freq_dict.items():
-        freq_eval = frequency_check(search_freq, freq)
-        if freq_eval == True:
-            for noun, morphinfo in noundict.items():
-                # Check length
-                if length_min <= len(noun) <= length_max:
-                    # Check for overlap of morphological criteria
-                    noun_genders = morphinfo['gender']
-                    noun_cases = morphinfo['case']
-                    noun_num = morphinfo['numerus']
-                    shared_genders = genders & noun_genders
-                    shared_cases = cases & noun_cases
-                    shared_nums = numerus & noun_num
-                    # Update the frequency dictionary if any overlap is found
-                    if shared_genders and shared_cases and shared_nums:
-                        if noun in freq_dict.keys():
-                            if freq in freq_dict[noun].keys():
-                                print("DUPLICATE")
-                            else:
-                                freq_dict[noun][freq]={'gender':shared_genders,
-                                                       'case':shared_cases,
-                                                       'numerus':shared_nums}
-                        else:
-                            freq_dict[noun] = dict()
-                            freq_dict[noun][freq]={'gender':shared_genders,
-                                                   'case':shared_cases,
-                                                   'numerus':shared_nums}
-        i += 1
-        if i % 1000 == 0:
-            print(' Noun search progress: {:2.0%}'.format(i/n), end='\r')
+    gender_mask = encode_mask(noun_index, 'gender', genders)
+    case_mask = encode_mask(noun_index, 'case', cases)
+    num_mask = encode_mask(noun_index, 'numerus', numerus)
+    gender_masks = noun_index['gender_masks']
+    case_masks = noun_index['case_masks']
+    num_masks = noun_index['numerus_masks']
+
+    lengths = noun_index['lengths']
+
+    def accept(row):
+        if not (length_min <= lengths[row] <= length_max
+                and gender_masks[row] & gender_mask
+                and case_masks[row] & case_mask
+                and num_masks[row] & num_mask):
+            return False
+        noun = noun_at(noun_index, row)
+        return noun != target_word and pattern_check(noun, patterns) and \
+            corpora_check(noun, corpus_freqs, corpus_columns)
+
+    freq_weight, length_weight = NEAREST_WEIGHTS
+    if target_length is None:
+        target_length = 0
+        length_weight = 0
+    query = (math.log10(max(search_freq, 0.01)), target_length)
+    neighbours = nearest_rows(noun_index, query, k,
+                              (freq_weight, length_weight), accept)
 
-    # Transform the frequency dictionary to a list
     freq_list = []
-    for word, f in freq_dict.items():
-        for freq, morph_info in f.items():
-            morph_all = []
-            for k, m in morph_info.items():
-                m = '/'.join(list(m))
-                morph_all.append(m)
-            freq_list.append((word, freq, morph_all[0],
-                              morph_all[1], morph_all[2]))
+    distances = []
+    for distance, row in neighbours:
+        freq_list.append((noun_at(noun_index, row),
+            noun_index['freqs'][row],
+            '/'.join(decode_mask(noun_index, 'gender',
+                                 gender_masks[row] & gender_mask)),
+            '/'.join(decode_mask(noun_index, 'case',
+                                 case_masks[row] & case_mask)),
+            '/'.join(decode_mask(noun_index, 'numerus',
+                                 num_masks[row] & num_mask))))
+        distances.append(round(distance, 2))
 
-    # Reorder list by increasing difference from the target freq:
-    freq_list = sorted(freq_list, key=lambda x: abs(search_freq - x[1]))
+    # Print search results
+    print('\n\nFound the following {} nearest nouns:\n'\
+          .format(len(freq_list)))
+    formatting_pattern = '{0: <25}|{1: ^13}|{2: ^20}|{3: ^20}|{4: ^12}|{5: ^10}'
+    print('\t' + formatting_pattern.format('           NOUN', 'FREQUENCY',
+                                           'GENDERS', 'CASES', 'NUMERUS',
+                                           'DISTANCE'))
+    print('\t' + '_'*105)
+    j = 0
+    for entry, distance in zip(freq_list, distances):
+        line = formatting_pattern.format(*entry, distance)
+        if j % 2 == 0:
+            print('\t{}{}{}'.format(back_search, line, reset_col))
+        else:
+            print('\t'+line)
+        j += 1
+
+    return freq_list
+
+def main_search(search_freq, length_min, length_max, genders, cases, numerus,
+                corpus_freqs=None, patterns=None):
+
+    '''
+    Extracts + prints words on the basis of the specified search criteria.
+    corpus_freqs optionally maps further corpora to a search frequency; nouns
+    then also have to lie within the frequency range in each of these corpora.
+    patterns optionally holds (kind, string) pairs (see PATTERN_KINDS)
+    that the nouns have to match.
+    Results are taken from the result cache if the same search was run before,
+    or filtered from a cached broader search if the new criteria only narrow
+    it down; otherwise the full noun table is scanned.
+    '''
+
+    search_key = normalize_criteria(search_freq, length_min, length_max,
+                                    genders, cases, numerus, corpus_freqs,
+                                    patterns)
+    matches = cache_lookup(search_key)
+    if matches is None:
+        matches = scan_nouns(search_freq, length_min, length_max,
+                             genders, cases, numerus, corpus_freqs, patterns)
+        cache_store(search_key, matches)
+
+    # Transform the matches to a list of printable entries
+    freq_list = []
+    for (word, freq, shared_genders, shared_cases, shared_nums) in matches:
+        freq_list.append((word, freq, '/'.join(shared_genders),
+                          '/'.join(shared_cases), '/'.join(shared_nums)))
 
     # Print search results
     print('\n\nFound the following {} nouns with similar frequency:\n'\
@@ -202,21 +412,180 @@ def main_search(search_freq, length_min, length_max, genders, cases, numerus):
 
     return freq_list
 
+def scan_nouns(search_freq, length_min, length_max, genders, cases, numerus,
+               corpus_freqs=None, patterns=None):
+
+    '''
+    Scans the noun index for nouns matching the search criteria.
+    Returns a list of (noun, freq, genders, cases, numerus) tuples holding the
+    morphological values shared with the criteria, sorted by increasing
+    frequency difference from the search frequency
+    '''
+
+    noun_index = get_resource('nouns')
+    if noun_index is None:
+        sys.exit()
+    corpus_columns = get_corpus_columns(corpus_freqs)
+
+    print('\nSearching for nouns...')
+
+    # Bit masks of the morphological criteria
+    gender_mask = encode_mask(noun_index, 'gender', genders)
+    case_mask = encode_mask(noun_index, 'case', cases)
+    num_mask = encode_mask(noun_index, 'numerus', numerus)
+
+    freqs = noun_index['freqs']
+    lengths = noun_index['lengths']
+    gender_masks = noun_index['gender_masks']
+    case_masks = noun_index['case_masks']
+    num_masks = noun_index['numerus_masks']
+
+    # Only the rows within the frequency bounds of the search are checked
+    freq_min, freq_max = frequency_bounds(search_freq)
+    rows = freq_rows(noun_index, freq_min, freq_max)
+    # With string patterns, only the rows matching the patterns
+    # within the frequency bounds are checked
+    if patterns:
+        matching_rows = pattern_rows(noun_index, patterns)
+        if len(matching_rows) < len(rows):
+            rows = sorted(row for row in matching_rows
+                          if rows.start <= row < rows.stop)
+        else:
+            rows = [row for row in rows if row in matching_rows]
+    matches = []
+    n = len(rows)
+    for i, row in enumerate(rows):
+        freq = freqs[row]
+        # Check frequency and length
+        if frequency_check(search_freq, freq) and \
+           length_min <= lengths[row] <= length_max:
+            # Check for overlap of morphological criteria
+            shared_genders = gender_masks[row] & gender_mask
+            shared_cases = case_masks[row] & case_mask
+            shared_nums = num_masks[row] & num_mask
+            # Keep the noun if any overlap is found
+            # (and the noun matches in all further corpora)
+            if shared_genders and shared_cases and shared_nums:
+                noun = noun_at(noun_index, row)
+                if pattern_check(noun, patterns) and \
+                   corpora_check(noun, corpus_freqs, corpus_columns):
+                    matches.append((noun, freq,
+                        decode_mask(noun_index, 'gender', shared_genders),
+                        decode_mask(noun_index, 'case', shared_cases),
+                        decode_mask(noun_index, 'numerus', shared_nums)))
+        if i % 100000 == 0:
+            print(' Noun search progress: {:2.0%}'.format(i/n), end='\r')
+
+    # Reorder list by increasing difference from the target freq:
+    matches = sorted(matches, key=lambda x: abs(search_freq - x[1]))
+
+    return matches
+
+def normalize_criteria(search_freq, length_min, length_max,
+                       genders, cases, numerus, corpus_freqs=None,
+                       patterns=None):
+    '''
+    Turns a set of search criteria into a hashable key for the result cache
+    '''
+    if corpus_freqs is None:
+        corpus_freqs = dict()
+    if patterns is None:
+        patterns = set()
+    return (float(search_freq), int(length_min), int(length_max),
+            frozenset(genders), frozenset(cases), frozenset(numerus),
+            frozenset(corpus_freqs.items()), frozenset(patterns))
+
+def is_refinement(new_key, old_key):
+    '''
+    Checks whether the search new_key only narrows down the search old_key,
+    i.e. whether every result of new_key is also a result of old_key
+    '''
+    (new_freq, new_min, new_max, new_genders, new_cases, new_nums,
+     new_corpora, new_patterns) = new_key
+    (old_freq, old_min, old_max, old_genders, old_cases, old_nums,
+     old_corpora, old_patterns) = old_key
+    return (new_freq == old_freq
+            and old_min <= new_min and new_max <= old_max
+            and new_genders <= old_genders
+            and new_cases <= old_cases
+            and new_nums <= old_nums
+            and old_corpora <= new_corpora
+            and old_patterns <= new_patterns)
+
+def refine_matches(matches, search_key):
+    '''
+    Filters the matches of a cached search down to those that satisfy the
+    narrower criteria in search_key (the order of the matches is kept)
+    '''
+    (search_freq, length_min, length_max, genders, cases, numerus,
+     corpus_items, patterns) = search_key
+    corpus_freqs = dict(corpus_items)
+    corpus_columns = get_corpus_columns(corpus_freqs)
+    refined = []
+    for (noun, freq, noun_genders, noun_cases, noun_nums) in matches:
+        if length_min <= len(noun) <= length_max:
+            shared_genders = genders & noun_genders
+            shared_cases = cases & noun_cases
+            shared_nums = numerus & noun_nums
+            if shared_genders and shared_cases and shared_nums and \
+               pattern_check(noun, patterns) and \
+               corpora_check(noun, corpus_freqs, corpus_columns):
+                refined.append((noun, freq, shared_genders,
+                                shared_cases, shared_nums))
+    return refined
+
+def cache_lookup(search_key):
+    '''
+    Returns the cached matches for a search, if available. If the search
+    narrows down a cached search, the cached matches are filtered
+    instead of rescanning the noun table. Returns None on a cache miss.
+    '''
+    if search_key in result_cache:
+        result_cache.move_to_end(search_key)
+        return result_cache[search_key]
+    # Refine the smallest cached search that contains the new one
+    best_key = None
+    for cached_key, cached_matches in result_cache.items():
+        if is_refinement(search_key, cached_key):
+            if best_key is None or \
+               len(cached_matches) < len(result_cache[best_key]):
+                best_key = cached_key
+    if best_key is None:
+        return None
+    result_cache.move_to_end(best_key)
+    matches = refine_matches(result_cache[best_key], search_key)
+    cache_store(search_key, matches)
+    return matches
+
+def cache_store(search_key, matches):
+    '''
+    Stores the matches of a search in the result cache and evicts the least
+    recently used searches (and their bigram results) beyond CACHE_SIZE
+    '''
+    result_cache[search_key] = matches
+    result_cache.move_to_end(search_key)
+    while len(result_cache) > CACHE_SIZE:
+        old_key, _ = result_cache.popitem(last=False)
+        for bigram_key in [k for k in bigram_cache if k[0] == old_key]:
+            del bigram_cache[bigram_key]
+
 def search_customization(genders, cases, numerus,
-                        length_min, length_max):
+                        length_min, length_max, corpora, patterns, nearest):
 
     '''
     Promts the user to enter their own search criteria
     (e.g. search only for plural nouns)
     '''
 
-    possible_cases = {'nom', 'gen', 'dat', 'acc'}
-    possible_numbers = {'sing', 'plu'}
-    possible_genders = {'fem', 'masc', 'neut'}
+    possible_cases = POSSIBLE_CASES
+    possible_numbers = POSSIBLE_NUMBERS
+    possible_genders = POSSIBLE_GENDERS
+    possible_corpora = available_corpora()
 
     choice_custom = check_input(input().strip().lower())
     if choice_custom != 'c':
-        return genders, cases, numerus, length_min, length_max
+        return genders, cases, numerus, length_min, length_max, corpora, \
+               patterns, nearest
 
     print('\nSEARCH CUSTOMIZATION OPTIONS:')
     print('\t*  LENGTH RANGE:\te.g. \'8-10\' for words of '
@@ -224,13 +593,21 @@ def search_customization(genders, cases, numerus,
     print('\t*  CASE:\t\tnom, gen, dat, acc')
     print('\t*  GENDER:\t\tmasc, fem, neut')
     print('\t*  NUMERUS:\t\tsing OR plu')
+    if possible_corpora:
+        print('\t*  CORPORA:\t\t{} (nouns must also match in frequency '
+              'in these corpora)'.format(', '.join(sorted(possible_corpora))))
+    print('\t*  PATTERN:\t\te.g. \'prefix:ver\', \'suffix:ung\' or '
+          '\'head:haus\' (compounds ending in -haus)')
+    print('\t*  NEAREST:\t\te.g. \'nearest 20\' for the 20 nouns closest '
+          'in frequency and length\n\t\t\t\t(instead of the frequency '
+          'ranges; \'nearest 0\' switches back)')
     print('\t*  Remove all search filters: simply type \'all\'')
     print('(Not all entries are required; it is possible to enter only e.g.\n'
           '\'3-5, masc, neut\' to restrict the search to masculine or neutrum\n'
           'nouns with a word length of 3 to 5 characters.)')
 
-    print('\n{}Type the desired word length range, gender(s), case(s) '
-          'and/or numerus.'
+    print('\n{}Type the desired word length range, gender(s), case(s), '
+          'numerus, corpora and/or patterns.'
           '\nSeparate each entry by a comma.{}'\
           .format(input_col, reset_col))
 
@@ -238,13 +615,29 @@ def search_customization(genders, cases, numerus,
     customizations = [el.strip() for el in custom_input.split(',')]
 
     if 'all' in customizations:
-        return possible_genders, possible_cases, possible_numbers, 1, 100
+        return possible_genders, possible_cases, possible_numbers, 1, 100, \
+               set(), set(), nearest
 
     new_cases = set()
     new_genders = set()
     new_numbers = set()
+    new_corpora = set()
+    new_patterns = set()
     for entry in customizations:
-        if '-' in entry:
+        if ':' in entry:
+            kind, pattern = [el.strip() for el in entry.split(':', 1)]
+            if kind in PATTERN_KINDS and pattern != '':
+                new_patterns.add((kind, pattern))
+        elif entry.split(' ')[0] == 'nearest':
+            try:
+                nearest = int(entry.split()[1])
+            except IndexError:
+                nearest = NEAREST_K
+            except ValueError:
+                pass
+            if nearest is not None and nearest <= 0:
+                nearest = None
+        elif '-' in entry:
             length_min, length_max = entry.split('-')
             try:
                 length_min = int(length_min)
@@ -257,14 +650,21 @@ def search_customization(genders, cases, numerus,
             new_numbers.add(entry)
         elif entry in possible_genders:
             new_genders.add(entry)
+        elif entry in possible_corpora:
+            new_corpora.add(entry)
     if new_cases != set():
         cases = new_cases
     if new_genders != set():
         genders = new_genders
     if new_numbers != set():
         numerus = new_numbers
+    if new_corpora != set():
+        corpora = new_corpora
+    if new_patterns != set():
+        patterns = new_patterns
 
-    return genders, cases, numerus, length_min, length_max
+    return genders, cases, numerus, length_min, length_max, corpora, \
+           patterns, nearest
 
 def frequency_check(target_freq, freq):
     '''
@@ -288,6 +688,73 @@ def frequency_check(target_freq, freq):
                 return True
     return False
 
+def pattern_rows(noun_index, patterns):
+    '''
+    Returns the set of noun index rows whose nouns match all string patterns,
+    looked up in the prefix and suffix orders of the noun index
+    '''
+    rows = None
+    for kind, pattern in patterns:
+        if kind == 'prefix':
+            found = set(prefix_rows(noun_index, pattern))
+        else:  # suffixes and compound heads
+            found = set(suffix_rows(noun_index, pattern))
+        if rows is None:
+            rows = found
+        else:
+            rows &= found
+    return rows
+
+def pattern_check(noun, patterns):
+    '''
+    Checks whether a noun matches all string patterns (case-insensitive);
+    a compound head has to be preceded by at least one further character
+    '''
+    if not patterns:
+        return True
+    noun = noun.lower()
+    for kind, pattern in patterns:
+        if kind == 'prefix' and not noun.startswith(pattern):
+            return False
+        elif kind == 'suffix' and not noun.endswith(pattern):
+            return False
+        elif kind == 'head' and (not noun.endswith(pattern)
+                                 or len(noun) <= len(pattern)):
+            return False
+    return True
+
+def frequency_intervals(target_freq):
+    '''
+    Returns the frequency intervals that pass frequency_check for the given
+    target frequency, as (lowest frequency, whether the lowest frequency
+    itself is excluded, highest frequency) tuples
+    '''
+    if (target_freq < 10):
+        return [(target_freq-1, False, target_freq+1)]
+    intervals = []
+    # Frequencies above 10 within +- 5
+    if target_freq-5 > 10:
+        intervals.append((target_freq-5, False, target_freq+5))
+    else:
+        intervals.append((10, True, target_freq+5))
+    # Frequencies of at most 10 within +- 1
+    if target_freq-1 <= 10:
+        intervals.append((target_freq-1, False, min(target_freq+1, 10)))
+    if (target_freq >= 100):
+        intervals.append((100, False, float('inf')))
+    return intervals
+
+def frequency_bounds(target_freq):
+    '''
+    Returns the lowest and highest frequency that can pass frequency_check
+    for the given target frequency
+    '''
+    if (target_freq < 10):
+        return target_freq-1, target_freq+1
+    elif (target_freq >= 100):
+        return min(100, target_freq-5), float('inf')
+    return target_freq-5, target_freq+5
+
 def frequency_range(freq):
     '''
     Prints the frequency ranges for a search given an input search frequency
@@ -319,10 +786,12 @@ def add_to_dict(noun_freq_dict, freq, noun, gender, case, num, create):
     noun_freq_dict[freq][noun]['numerus'].add(num)
     return noun_freq_dict
 
-def read_nouns(filename):
+def read_nouns(filename, status=None):
     '''
     Pre-load the nouns and store them in a dictionary structure
-    for rapid access
+    for rapid access.
+    If a status dictionary is given, the progress is stored in it
+    instead of being printed (for loading in the background)
     '''
     noun_freq_dict = dict()
     with open(filename, 'r', encoding='utf-8') as F:
@@ -348,15 +817,28 @@ def read_nouns(filename):
                                              gender, case, num, True)
             i += 1
             if i % 1000 == 0:
-                print(' (1/2) Reading in nouns. Progress: {:2.0%}'\
-                      .format(i/n), end='\r')
+                if status is not None:
+                    status['nouns'] = min(i/n, 0.99)
+                else:
+                    print(' (1/2) Reading in nouns. Progress: {:2.0%}'\
+                          .format(i/n), end='\r')
     return noun_freq_dict
 
+def load_nouns(filename, status=None):
+    '''
+    Attaches to the shared noun index of the noun file; the index is
+    (re)built first if it does not exist yet or if the noun file has changed
+    '''
+    noun_index = attach_noun_index(filename)
+    if noun_index is None:
+        noun_index = build_noun_index(read_nouns(filename, status), filename)
+    return noun_index
+
 def get_target_freq(target_word):
     '''
     Extracts the frequency of the input target word from the frequency file
     '''
-    with open('deWaC_freqlist.tsv', 'r', encoding='utf-8') as F:
+    with open(CORPORA[PRIMARY_CORPUS], 'r', encoding='utf-8') as F:
         for line in F:
             line=line.split()
             word=line[0]
@@ -370,10 +852,101 @@ def get_target_freq(target_word):
         choice = check_input(input().strip())
         start_search()
 
+def read_corpus_freqs(filename, name, status=None):
+    '''
+    Pre-load the noun frequencies of a further corpus (one frequency per noun).
+    If a status dictionary is given, the progress is stored in it
+    under the given name
+    '''
+    corpus_freq_dict = dict()
+    filesize = os.path.getsize(filename)
+    with open(filename, 'rb') as F:
+        i = 0
+        for line in F:
+            line = line.decode('utf-8').split()
+            noun = line[0]
+            if noun not in corpus_freq_dict:
+                corpus_freq_dict[noun] = float(line[1])
+            i += 1
+            if i % 1000 == 0 and status is not None:
+                status[name] = min(F.tell()/filesize, 0.99)
+    return corpus_freq_dict
+
+def available_corpora():
+    '''
+    Returns the further corpora whose frequency list is present
+    '''
+    return {corpus for corpus, filename in CORPORA.items()
+            if corpus != PRIMARY_CORPUS and os.path.exists(filename)}
+
+def get_corpus_columns(corpus_freqs):
+    '''
+    Returns the frequency dictionaries of the corpora used in a search,
+    loading the corpora that have not been loaded yet.
+    Corpora that could not be loaded are left out.
+    '''
+    if not corpus_freqs:
+        return dict()
+    for corpus in corpus_freqs:
+        name = 'corpus:' + corpus
+        if name not in loaders:
+            RESOURCE_NAMES[name] = '{} frequencies'.format(corpus)
+            start_loading(name, read_corpus_freqs, CORPORA[corpus],
+                          name, load_status)
+    corpus_columns = dict()
+    for corpus in corpus_freqs:
+        column = get_resource('corpus:' + corpus)
+        if column is not None:
+            corpus_columns[corpus] = column
+    return corpus_columns
+
+def get_corpus_search_freqs(corpora, search_freq, target_word):
+    '''
+    Determines the search frequency in each further corpus: the frequency of
+    the target word in that corpus (MODE 1), or the input search frequency
+    (MODE 2). Corpora that do not contain the target word are skipped.
+    '''
+    corpus_freqs = dict()
+    if not corpora:
+        return corpus_freqs
+    corpus_columns = get_corpus_columns(dict.fromkeys(corpora))
+    for corpus in sorted(corpora):
+        if corpus not in corpus_columns:
+            print('{}The {} frequencies are not available; '
+                  'this corpus is ignored.{}'\
+                  .format(warn_col, corpus, reset_col))
+        elif target_word is None:
+            corpus_freqs[corpus] = search_freq
+        elif target_word in corpus_columns[corpus]:
+            corpus_freqs[corpus] = corpus_columns[corpus][target_word]
+            print('\tFrequency in {}: \t{} per million'\
+                  .format(corpus, corpus_freqs[corpus]))
+        else:
+            print('\n{}The noun \'{}\' was not found in {}; '
+                  'this corpus is ignored.{}'\
+                  .format(warn_col, target_word, corpus, reset_col))
+    return corpus_freqs
+
+def corpora_check(noun, corpus_freqs, corpus_columns):
+    '''
+    Checks whether a noun lies within the frequency range of the search in
+    each further corpus (nouns missing from a corpus never match)
+    '''
+    if not corpus_freqs:
+        return True
+    for corpus, search_freq in corpus_freqs.items():
+        freq = corpus_columns[corpus].get(noun)
+        if freq is None or not frequency_check(search_freq, freq):
+            return False
+    return True
+
 def get_target_morph(noun):
     '''
     Extracts the possible genders, cases and numbers of the input target word
     '''
+    analyzer = get_resource('analyzer')
+    if analyzer is None:
+        sys.exit()
     s = analyzer.analyze(noun)
     genders = set()
     cases = set()
@@ -384,12 +957,17 @@ def get_target_morph(noun):
         numbers.add(x.numerus)
     return genders, cases, numbers
 
-def read_verbs(filename):
+def read_verbs(filename, status=None):
     '''
     Pre-load the noun-verb bigrams and store them in a dictionary structure
-    for rapid access
+    for rapid access. Each verb is mapped to a list of
+    (noun, bigram count, pmi, logdice, g2) tuples; the association scores
+    are None if the bigram file contains no scores (see bigram_association.py).
+    If a status dictionary is given, the progress is stored in it
+    instead of being printed (for loading in the background)
     '''
-    print()
+    if status is None:
+        print()
     verb_dict = dict()
     i = 0
     # number of lines in bigram file (3306296) plus manually added bigrams
@@ -400,67 +978,128 @@ def read_verbs(filename):
                 + 835 + 52 + 180 + 369 + 699
     with open(filename, 'r', encoding='utf-8') as F:
         for line in F:
-            line = line.split('\t')
+            line = line.rstrip('\n').split('\t')
             i += 1
             if i % 100 == 0:
-                print(' (2/2) Reading in noun-verb bigrams. Progress: {:2.0%}'\
-                      .format(i/n_bigrams), end='\r')
+                if status is not None:
+                    status['verbs'] = min(i/n_bigrams, 0.99)
+                else:
+                    print(' (2/2) Reading in noun-verb bigrams. '
+                          'Progress: {:2.0%}'.format(i/n_bigrams), end='\r')
             bigram_count = line[0]
             noun = line[1].title()
             noun_pos = line[2]
             verb = line[3]
             verb_pos = line[4]
+            if len(line) >= 8:
+                scores = tuple(float(score) for score in line[5:8])
+            else:
+                scores = (None, None, None)
             try:
-                verb_dict[verb].append((noun, bigram_count))
+                verb_dict[verb].append((noun, bigram_count) + scores)
             except:
-                verb_dict[verb] = [(noun, bigram_count)]
+                verb_dict[verb] = [(noun, bigram_count) + scores]
     return verb_dict
 
-def bigram_search(freq_list):
+def load_verbs(filename, status=None):
+    '''
+    Attaches to the shared verb index of the bigram file; the index is
+    (re)built first if it does not exist yet or if the bigram file has changed
+    '''
+    verb_index = attach_verb_index(filename)
+    if verb_index is None:
+        verb_index = build_verb_index(read_verbs(filename, status), filename)
+    return verb_index
+
+def bigram_search(freq_list, search_key=None):
     '''
     Checks whether the nouns found in the main search occur with an
     input verb in the lemmatized deWaC bigram list
+    (results are memoized per search and verb).
+    Optionally, the results are ranked by an association measure
+    and restricted to a minimum score.
     '''
     print('\n{}Please enter a verb (infinitive) to check for '
-          'co-occurrence with the retrieved nouns:{}'\
-          .format(input_col, reset_col), end=' ')
+          'co-occurrence with the retrieved nouns.\n'
+          'To rank the nouns by association strength, add a measure ({}) '
+          'and optionally a minimum score, e.g. \'essen logdice 7\':{}'\
+          .format(input_col, ', '.join(ASSOCIATION_MEASURES), reset_col),
+          end=' ')
 
-    # Transform freq_list to dict for easy lookup:
-    freq_dict = {}
-    for (noun, freq, genders, cases, nums) in freq_list:
-        freq_dict[noun] = (freq, genders, cases, nums)
-    target_verb = check_input(input().strip())
-    target_verb = target_verb.lower()
+    verb_input = check_input(input().strip()).lower().split()
+    target_verb = ''
+    measure = None
+    min_score = None
+    if len(verb_input) > 0:
+        target_verb = verb_input[0]
+    if len(verb_input) > 1 and verb_input[1] in ASSOCIATION_MEASURES:
+        measure = verb_input[1]
+        if len(verb_input) > 2:
+            try:
+                min_score = float(verb_input[2])
+            except ValueError:
+                pass
 
     # If no verb is entered, start again
     if target_verb == '' or target_verb == 'v' or target_verb == 'c':
         print('\n{}Input is not a verb.{}'\
               .format(warn_col, reset_col))
-        continue_options(freq_list)
+        continue_options(freq_list, search_key)
+
+    verb_index = get_resource('verbs')
+    if verb_index is None:
+        continue_options(freq_list, search_key)
 
-    keep_bigrams = []
-    if target_verb in verb_dict.keys():
-        for (noun, bigram_count) in verb_dict[target_verb]:
-            if noun in freq_dict.keys():
-                freq = freq_dict[noun][0]
-                genders = freq_dict[noun][1]
-                cases = freq_dict[noun][2]
-                nums = freq_dict[noun][3]
-                keep_bigrams.append((bigram_count, noun, freq,
-                                     genders, cases, nums))
+    pairs = verb_pairs(verb_index, target_verb)
+    if pairs is not None:
+        if (search_key, target_verb) in bigram_cache:
+            keep_bigrams = bigram_cache[(search_key, target_verb)]
+        else:
+            # Transform freq_list to dict for easy lookup:
+            freq_dict = {}
+            for (noun, freq, genders, cases, nums) in freq_list:
+                freq_dict[noun] = (freq, genders, cases, nums)
+            keep_bigrams = []
+            for (noun, bigram_count, *scores) in pairs:
+                if noun in freq_dict.keys():
+                    freq = freq_dict[noun][0]
+                    genders = freq_dict[noun][1]
+                    cases = freq_dict[noun][2]
+                    nums = freq_dict[noun][3]
+                    keep_bigrams.append((bigram_count, noun, freq,
+                                         genders, cases, nums, *scores))
+            if search_key in result_cache:
+                bigram_cache[(search_key, target_verb)] = keep_bigrams
+        # Rank by the association measure (precomputed in the bigram file)
+        if measure is not None:
+            m = 6 + ASSOCIATION_MEASURES.index(measure)
+            if any(entry[m] is None for entry in keep_bigrams):
+                print('\n{}The bigram file contains no association scores. '
+                      'To add them, use the script bigram_association.py.{}'\
+                      .format(warn_col, reset_col))
+                measure = None
+            else:
+                if min_score is not None:
+                    keep_bigrams = [entry for entry in keep_bigrams
+                                    if entry[m] >= min_score]
+                keep_bigrams = sorted(keep_bigrams, key=lambda x: -x[m])
         # Print search results
         if len(keep_bigrams) > 0:
             print('\n\nOut of the {} search results, {} nouns can occur with '
                   '\'{}\':\n'\
                   .format(len(freq_list), len(keep_bigrams), target_verb))
             formatting_pattern='{0:^14}|{1:<25}|{2:^13}|{3:^20}|{4:^20}|{5:^12}'
-            print('\t'+formatting_pattern.format('BIGRAM COUNT',
-                                                 '           NOUN',
-                                                 'FREQUENCY', 'GENDERS',
-                                                 'CASES', 'NUMERUS'))
-            print('\t' + '_'*109)
+            header = ['BIGRAM COUNT', '           NOUN', 'FREQUENCY',
+                      'GENDERS', 'CASES', 'NUMERUS']
+            if measure is not None:
+                formatting_pattern += '|{6:^10}'
+                header.append(measure.upper())
+            print('\t'+formatting_pattern.format(*header))
+            print('\t' + '_'*(109 + 11*(measure is not None)))
             j = 0
             for entry in keep_bigrams:
+                if measure is not None:
+                    entry = entry[:6] + (round(entry[m], 2),)
                 line=formatting_pattern.format(*entry)
                 if j % 2 == 0:
                     print('\t{}{}{}'.format(back_verbs, line, reset_col))
@@ -468,15 +1107,20 @@ def bigram_search(freq_list):
                     print('\t'+line)
                 j += 1
         else:
-            print('\n{}None of the search nouns are attested with \'{}\'.{}'\
-                  .format(warn_col, target_verb, reset_col))
+            if min_score is not None:
+                print('\n{}None of the search nouns reach a {} score of {} '
+                      'with \'{}\'.{}'.format(warn_col, measure, min_score,
+                                               target_verb, reset_col))
+            else:
+                print('\n{}None of the search nouns are attested with '
+                      '\'{}\'.{}'.format(warn_col, target_verb, reset_col))
     else:
         print('\n{}The verb {} is not present in the bigram file.\n'
               'To add it, use the script bigram_extractor_manual.py.{}'\
               .format(warn_col, target_verb, reset_col))
-    continue_options(freq_list)
+    continue_options(freq_list, search_key)
 
-def continue_options(freq_list):
+def continue_options(freq_list, search_key=None):
     '''
     After completing a search, the user can choose between running a new search,
     doing a bigram search for the obtained nouns, or exiting the program.
@@ -494,12 +1138,75 @@ def continue_options(freq_list):
             start_search()
         elif continue_input == 'v':
             flag = False
-            bigram_search(freq_list)
+            bigram_search(freq_list, search_key)
         else:
             print('{}Could not interpret choice. Please try again.{}'\
                   .format(warn_col, reset_col))
             continue_input = check_input(input().strip().lower())
 
+def start_loading(name, function, *args, **kwargs):
+    '''
+    Starts loading a resource (the return value of function(*args, **kwargs))
+    in a background thread
+    '''
+    def load():
+        try:
+            resources[name] = function(*args, **kwargs)
+        except Exception as error:
+            load_errors[name] = error
+        load_status[name] = 1.0
+
+    load_status[name] = 0.0
+    loaders[name] = threading.Thread(target=load, daemon=True)
+    loaders[name].start()
+
+def get_resource(name):
+    '''
+    Returns a resource, waiting for it to finish loading if necessary.
+    Returns None if the resource could not be loaded.
+    '''
+    if loaders[name].is_alive():
+        print('\nWaiting for the {} to finish loading...'\
+              .format(RESOURCE_NAMES[name]))
+        while loaders[name].is_alive():
+            print(' Progress: {:2.0%}'.format(load_status[name]), end='\r')
+            loaders[name].join(timeout=0.5)
+        print()
+    if name in load_errors:
+        print('\n{}Could not load the {}: {}{}'\
+              .format(warn_col, RESOURCE_NAMES[name], load_errors[name],
+                      reset_col))
+        return None
+    return resources[name]
+
+def resource_ready(name):
+    '''
+    Checks whether a resource has been loaded successfully
+    '''
+    return name in resources and not loaders[name].is_alive()
+
+def print_load_status():
+    '''
+    Prints which resources are still being loaded in the background
+    and which could not be loaded
+    '''
+    loading = []
+    failed = []
+    for name in RESOURCE_NAMES:
+        if name in load_errors:
+            failed.append(RESOURCE_NAMES[name])
+        elif loaders[name].is_alive():
+            loading.append('{} ({:2.0%})'.format(RESOURCE_NAMES[name],
+                                                  load_status[name]))
+    if loading:
+        print('{}Still loading: {}{}'\
+              .format(warn_col, ', '.join(loading), reset_col))
+    if failed:
+        print('{}Not available: {}{}'\
+              .format(warn_col, ', '.join(failed), reset_col))
+    if loading or failed:
+        print()
+
 def check_input(some_input):
     '''
     Function to be called on every user input that checks whether
@@ -535,17 +1242,16 @@ if __name__ == '__main__':
     print('(https://wacky.sslmit.unibo.it/doku.php?id=frequency_lists')
     print('to find German nouns by their frequency, length, and')
     print('morphological criteria (gender, case and numerus).')
-    print('\nInitializing, please wait...')
-
-    # Initialize gender classifier and POS tagger
-    analyzer = Analyzer(char_subs_allowed=True)
 
-    # Read in the verb bigram file and the noun file
-    noun_freq_dict = read_nouns('deWaC_freqlist.tsv')
-    verb_dict = read_verbs('bigrams_noun_verb_freq2+.tsv')
+    # Initialize gender classifier and POS tagger and read in the noun file
+    # and the verb bigram file in the background
+    start_loading('analyzer', Analyzer, char_subs_allowed=True)
+    start_loading('nouns', load_nouns, CORPORA[PRIMARY_CORPUS], load_status)
+    start_loading('verbs', load_verbs, BIGRAM_FILE, load_status)
 
     # Start prompt
-    print('\n\n{}Finished initialization. Press Enter to start.{}'\
+    print('\n{}The data is loaded in the background; searches will wait '
+          'for it if necessary.\nPress Enter to start.{}'\
           .format(input_col, reset_col))
     print('\n{}To exit the program, simply type \'quit\' or \'q\' '
           'followed by Enter at any point.{}'\
@@ -0,0 +1,575 @@
+'''
+18 October 2026
+
+Flat, memory-mapped indexes of the noun frequency list and the noun-verb
+bigrams, to be shared between several processes on the same machine.
+
+Reading in deWaC_freqlist.tsv and bigrams_noun_verb_freq2+.tsv into
+dictionaries takes a while and every process holds its own copy.
+Instead, the loaded dictionaries are written once to an index file
+(<datafile>.idx) consisting of flat arrays. Other processes map this
+file read-only into memory: attaching takes milliseconds, and since all
+processes share the same pages of the file, N processes cost roughly one
+index's worth of RAM.
+
+An index file stores the size and modification time of its data file and
+is rebuilt automatically when the data file changes. If the directory of
+the data file is not writable (e.g. a shared, read-only data directory),
+the index is written to a per-user cache directory instead (INDEX_CACHE_DIR,
+one file per data file path); if that fails as well, the index is built in
+memory for the current process only.
+
+Noun index: one row per (noun, frequency) pair, sorted by frequency, with
+the morphological analyses stored as bit masks over the gender, case and
+numerus values found in the data. Two permutations of the rows serve
+pattern searches: the rows sorted by the lowercased noun (all nouns with a
+given prefix form one block, like a subtree of a prefix trie) and by the
+reversed lowercased noun (the same for suffixes and compound heads).
+The noun index also stores a count cube: the number of rows per fine
+frequency bin (0.01 per million), word length and combination of gender,
+case and numerus masks, from which the number of results of a search is
+computed without scanning the rows. Finally, a KD-tree over the log
+frequency and the length of the nouns serves nearest neighbour searches;
+it is stored implicitly as a permutation of the rows (the median of each
+range splits it, alternating between the two dimensions).
+
+Verb index: the verbs in alphabetical order, each pointing to its block of
+(noun, bigram count, pmi, logdice, g2) entries (missing association scores
+are stored as NaN).
+
+'''
+
+import hashlib
+import heapq
+import io
+import json
+import math
+import mmap
+import os
+import struct
+from array import array
+from bisect import bisect_left, bisect_right
+
+
+NOUN_MAGIC = b'GNFNOUN4'
+VERB_MAGIC = b'GNFVERB2'
+# magic, data file size, data file modification time,
+# offset and length of the metadata (JSON) at the end of the index file
+HEADER = struct.Struct('=8sqqqq')
+MORPH_KEYS = ('gender', 'case', 'numerus')
+# Association scores that bigram_association.py adds to the bigram file
+ASSOCIATION_MEASURES = ('pmi', 'logdice', 'g2')
+# Ranges of at most this many rows are not split further in the KD-tree
+KD_LEAF_SIZE = 16
+# Location of the index files of data files in read-only directories
+INDEX_CACHE_DIR = os.path.join(os.environ.get('XDG_CACHE_HOME') or
+                               os.path.join(os.path.expanduser('~'), '.cache'),
+                               'german_noun_frequency_tool')
+
+
+def index_filenames(datafile):
+    '''
+    Returns the possible index files of a data file, in order of preference:
+    next to the data file, or in the cache directory (named after a hash of
+    the absolute path of the data file)
+    '''
+    path = os.path.abspath(datafile)
+    key = hashlib.sha1(path.encode('utf-8')).hexdigest()[:16]
+    return [datafile + '.idx',
+            os.path.join(INDEX_CACHE_DIR,
+                         '{}-{}.idx'.format(os.path.basename(path), key))]
+
+def find_index(datafile, magic):
+    '''
+    Returns the name of an up-to-date index file of a data file,
+    or None if there is none
+    '''
+    for indexfile in index_filenames(datafile):
+        if index_is_fresh(indexfile, datafile, magic):
+            return indexfile
+    return None
+
+def index_is_fresh(indexfile, datafile, magic):
+    '''
+    Checks whether an index file exists and was built from the current
+    version of the data file
+    '''
+    try:
+        with open(indexfile, 'rb') as F:
+            header = F.read(HEADER.size)
+    except OSError:
+        return False
+    if len(header) != HEADER.size:
+        return False
+    file_magic, size, mtime, _, _ = HEADER.unpack(header)
+    stat = os.stat(datafile)
+    return (file_magic == magic and size == stat.st_size
+            and mtime == stat.st_mtime_ns)
+
+def pack_index(F, datafile, magic, sections, meta):
+    '''
+    Writes flat arrays (sections: name -> array) and a metadata dictionary
+    to a binary file object
+    '''
+    stat = os.stat(datafile)
+    meta = dict(meta)
+    meta['sections'] = dict()
+    F.write(bytes(HEADER.size))
+    for name, values in sections.items():
+        F.write(bytes(-F.tell() % 8))  # align each section
+        meta['sections'][name] = (values.typecode, F.tell(), len(values))
+        values.tofile(F)
+    meta_bytes = json.dumps(meta).encode('utf-8')
+    meta_offset = F.tell()
+    F.write(meta_bytes)
+    F.seek(0)
+    F.write(HEADER.pack(magic, stat.st_size, stat.st_mtime_ns,
+                        meta_offset, len(meta_bytes)))
+    return
+
+def write_index(datafile, magic, sections, meta):
+    '''
+    Writes an index file for a data file and attaches to it. The file is
+    written under a temporary name and then renamed, so that other processes
+    never attach to a half-written index. If neither the directory of the
+    data file nor the cache directory is writable, the index is built in
+    memory instead.
+    '''
+    for indexfile in index_filenames(datafile):
+        tmpfile = '{}.{}.tmp'.format(indexfile, os.getpid())
+        try:
+            os.makedirs(os.path.dirname(os.path.abspath(indexfile)),
+                        exist_ok=True)
+            with open(tmpfile, 'wb') as F:
+                pack_index(F, datafile, magic, sections, meta)
+                F.flush()
+                os.fsync(F.fileno())
+            os.replace(tmpfile, indexfile)
+        except OSError:
+            if os.path.exists(tmpfile):
+                os.remove(tmpfile)
+            continue
+        return attach_index(indexfile, magic)
+    F = io.BytesIO()
+    pack_index(F, datafile, magic, sections, meta)
+    return index_from_buffer(F.getbuffer(), magic, '<in-memory index>')
+
+def attach_index(indexfile, magic):
+    '''
+    Maps an index file read-only into memory.
+    Returns a dictionary holding the metadata and one memoryview per section.
+    '''
+    with open(indexfile, 'rb') as F:
+        mapped = mmap.mmap(F.fileno(), 0, access=mmap.ACCESS_READ)
+    return index_from_buffer(mapped, magic, indexfile)
+
+def index_from_buffer(mapped, magic, name):
+    '''
+    Returns a dictionary holding the metadata and one memoryview per section
+    of an index held in a buffer (a memory-mapped file or a bytes buffer)
+    '''
+    file_magic, _, _, meta_offset, meta_length = \
+        HEADER.unpack_from(mapped, 0)
+    if file_magic != magic:
+        raise ValueError('{} is not a valid index file'.format(name))
+    meta = json.loads(bytes(mapped[meta_offset:meta_offset+meta_length]))
+    buffer = memoryview(mapped)
+    index = {'meta': meta, 'mmap': mapped}
+    for name, (typecode, offset, n) in meta['sections'].items():
+        size = array(typecode).itemsize * n
+        index[name] = buffer[offset:offset+size].cast(typecode)
+    return index
+
+def pack_strings(strings):
+    '''
+    Packs a list of strings into one UTF-8 byte array plus an array of
+    n+1 offsets (string i is located at offsets[i]:offsets[i+1])
+    '''
+    text = bytearray()
+    offsets = array('I', [0])
+    for string in strings:
+        text += string.encode('utf-8')
+        offsets.append(len(text))
+    return array('B', text), offsets
+
+def string_at(text, offsets, i):
+    '''
+    Returns string i from a packed string array
+    '''
+    return str(text[offsets[i]:offsets[i+1]], 'utf-8')
+
+def build_noun_index(noun_freq_dict, datafile):
+    '''
+    Writes the noun dictionary (as returned by read_nouns in
+    german_noun_frequency_tool.py) to the index file of the data file.
+    Returns the attached index.
+    '''
+    values = {key: set() for key in MORPH_KEYS}
+    rows = []
+    for freq, noundict in noun_freq_dict.items():
+        for noun, morphinfo in noundict.items():
+            rows.append((freq, noun, morphinfo))
+            for key in MORPH_KEYS:
+                values[key] |= morphinfo[key]
+    rows.sort(key=lambda row: (row[0], row[1]))
+    values = {key: sorted(values[key]) for key in MORPH_KEYS}
+    bits = {key: {value: 1 << b for b, value in enumerate(values[key])}
+            for key in MORPH_KEYS}
+
+    freqs = array('d')
+    lengths = array('H')
+    masks = {key: array('H') for key in MORPH_KEYS}
+    for (freq, noun, morphinfo) in rows:
+        freqs.append(freq)
+        lengths.append(min(len(noun), 65535))
+        for key in MORPH_KEYS:
+            mask = 0
+            for value in morphinfo[key]:
+                mask |= bits[key][value]
+            masks[key].append(mask)
+    names, name_offsets = pack_strings([row[1] for row in rows])
+    prefix_order = array('I', sorted(range(len(rows)),
+                                     key=lambda i: rows[i][1].lower()))
+    suffix_order = array('I', sorted(range(len(rows)),
+                                     key=lambda i: rows[i][1].lower()[::-1]))
+
+    sections = {'freqs': freqs, 'lengths': lengths,
+                'names': names, 'name_offsets': name_offsets,
+                'prefix_order': prefix_order, 'suffix_order': suffix_order}
+    for key in MORPH_KEYS:
+        sections[key + '_masks'] = masks[key]
+    sections.update(build_count_cube(freqs, lengths, masks))
+    sections['kd_order'] = build_kd_tree(freqs, lengths)
+    return write_index(datafile, NOUN_MAGIC, sections,
+                       {'n': len(rows), 'values': values})
+
+def attach_noun_index(datafile):
+    '''
+    Maps the noun index of a data file read-only into memory.
+    Returns None if there is no up-to-date index of the data file.
+    '''
+    indexfile = find_index(datafile, NOUN_MAGIC)
+    if indexfile is None:
+        return None
+    return attach_index(indexfile, NOUN_MAGIC)
+
+def noun_at(noun_index, i):
+    '''
+    Returns the noun in row i of the noun index
+    '''
+    return string_at(noun_index['names'], noun_index['name_offsets'], i)
+
+def encode_mask(noun_index, key, values):
+    '''
+    Transforms a set of morphological values (e.g. {'masc', 'fem'})
+    into a bit mask for the given key ('gender', 'case' or 'numerus')
+    '''
+    mask = 0
+    for b, value in enumerate(noun_index['meta']['values'][key]):
+        if value in values:
+            mask |= 1 << b
+    return mask
+
+def decode_mask(noun_index, key, mask):
+    '''
+    Transforms a bit mask back into a set of morphological values
+    '''
+    return {value for b, value in enumerate(noun_index['meta']['values'][key])
+            if mask & (1 << b)}
+
+def freq_rows(noun_index, freq_min, freq_max):
+    '''
+    Returns the range of rows with freq_min <= frequency <= freq_max
+    '''
+    freqs = noun_index['freqs']
+    start = bisect_left(freqs, freq_min)
+    end = bisect_right(freqs, freq_max)
+    return range(start, end)
+
+def lower_bound(noun_index, order, target, reverse):
+    '''
+    Returns the first position in order (prefix_order or suffix_order)
+    whose lowercased (and, for suffix_order, reversed) noun is >= target
+    '''
+    low = 0
+    high = len(order)
+    while low < high:
+        middle = (low + high) // 2
+        key = noun_at(noun_index, order[middle]).lower()
+        if reverse:
+            key = key[::-1]
+        if key < target:
+            low = middle + 1
+        else:
+            high = middle
+    return low
+
+def prefix_rows(noun_index, prefix):
+    '''
+    Returns the rows of all nouns starting with prefix (case-insensitive)
+    '''
+    order = noun_index['prefix_order']
+    prefix = prefix.lower()
+    start = lower_bound(noun_index, order, prefix, False)
+    end = lower_bound(noun_index, order, prefix + chr(0x10FFFF), False)
+    return order[start:end]
+
+def suffix_rows(noun_index, suffix):
+    '''
+    Returns the rows of all nouns ending in suffix (case-insensitive)
+    '''
+    order = noun_index['suffix_order']
+    suffix = suffix.lower()[::-1]
+    start = lower_bound(noun_index, order, suffix, True)
+    end = lower_bound(noun_index, order, suffix + chr(0x10FFFF), True)
+    return order[start:end]
+
+def freq_bin(freq):
+    '''
+    Returns the fine frequency bin (in 0.01 per million) of a frequency
+    '''
+    return round(freq * 100)
+
+def build_count_cube(freqs, lengths, masks):
+    '''
+    Counts the rows per (length, gender mask, case mask, numerus mask) cell
+    and frequency bin. Each cell holds its frequency bins in increasing order
+    with cumulative counts, so that the number of rows of a cell within a
+    frequency range is the difference of two cumulative counts.
+    '''
+    cells = dict()
+    for i in range(len(freqs)):  # rows are sorted by frequency
+        cell = (lengths[i], masks['gender'][i], masks['case'][i],
+                masks['numerus'][i])
+        bins = cells.setdefault(cell, [])
+        b = freq_bin(freqs[i])
+        if bins and bins[-1][0] == b:
+            bins[-1][1] += 1
+        else:
+            bins.append([b, 1])
+    cube = {'cube_' + key: array('H') for key in ('lengths',) + MORPH_KEYS}
+    cube['cube_offsets'] = array('I', [0])
+    cube['cube_bins'] = array('i')
+    cube['cube_counts'] = array('I')
+    for cell in sorted(cells):
+        for key, value in zip(('lengths',) + MORPH_KEYS, cell):
+            cube['cube_' + key].append(value)
+        total = 0
+        for b, count in cells[cell]:
+            total += count
+            cube['cube_bins'].append(b)
+            cube['cube_counts'].append(total)
+        cube['cube_offsets'].append(len(cube['cube_bins']))
+    return cube
+
+def freq_bin_ranges(intervals):
+    '''
+    Transforms frequency intervals (lowest frequency, whether the lowest
+    frequency itself is excluded, highest frequency) into merged ranges of
+    frequency bins, using the same float comparisons as the search
+    '''
+    ranges = []
+    for (low, exclusive, high) in intervals:
+        if high == float('inf'):
+            last = 2**31 - 1
+        else:
+            last = math.ceil(high * 100) + 1
+            while last / 100 > high:
+                last -= 1
+        first = max(math.floor(low * 100) - 1, 0)
+        while first / 100 < low or (exclusive and first / 100 == low):
+            first += 1
+        if first <= last:
+            ranges.append([first, last])
+    ranges.sort()
+    merged = []
+    for first, last in ranges:
+        if merged and first <= merged[-1][1] + 1:
+            merged[-1][1] = max(merged[-1][1], last)
+        else:
+            merged.append([first, last])
+    return merged
+
+def cube_count(noun_index, bin_ranges, length_min, length_max,
+               gender_mask, case_mask, num_mask):
+    '''
+    Returns the number of rows within the frequency bin ranges and the
+    length range that share at least one gender, case and numerus value with
+    the given masks, computed from the count cube
+    '''
+    lengths = noun_index['cube_lengths']
+    offsets = noun_index['cube_offsets']
+    bins = noun_index['cube_bins']
+    counts = noun_index['cube_counts']
+    genders = noun_index['cube_gender']
+    cases = noun_index['cube_case']
+    nums = noun_index['cube_numerus']
+    total = 0
+    # Cells are sorted by length first
+    for cell in range(bisect_left(lengths, length_min),
+                      bisect_right(lengths, length_max)):
+        if not (genders[cell] & gender_mask and cases[cell] & case_mask
+                and nums[cell] & num_mask):
+            continue
+        start = offsets[cell]
+        end = offsets[cell+1]
+        for first, last in bin_ranges:
+            i = bisect_left(bins, first, start, end)
+            j = bisect_right(bins, last, start, end)
+            if j > i:
+                total += counts[j-1]
+                if i > start:
+                    total -= counts[i-1]
+    return total
+
+def kd_point(freqs, lengths, row):
+    '''
+    Returns the KD-tree coordinates of a row: log10 frequency and length
+    '''
+    return (math.log10(max(freqs[row], 0.01)), lengths[row])
+
+def build_kd_tree(freqs, lengths):
+    '''
+    Builds the implicit KD-tree: within each range of the row permutation,
+    the rows are ordered along the split dimension of the range, so that
+    the middle row is the split point with the lower half before it and the
+    upper half after it
+    '''
+    points = [kd_point(freqs, lengths, row) for row in range(len(freqs))]
+    order = list(range(len(freqs)))
+    stack = [(0, len(order), 0)]
+    while stack:
+        low, high, dim = stack.pop()
+        if high - low <= KD_LEAF_SIZE:
+            continue
+        order[low:high] = sorted(order[low:high],
+                                 key=lambda row: points[row][dim])
+        middle = (low + high) // 2
+        stack.append((low, middle, 1 - dim))
+        stack.append((middle + 1, high, 1 - dim))
+    return array('I', order)
+
+def nearest_rows(noun_index, query, k, weights, accept):
+    '''
+    Returns the k rows closest to the query point (log10 frequency, length)
+    as a list of (distance, row) pairs, sorted by increasing distance.
+    The distance is the Euclidean distance with each dimension multiplied by
+    its weight; only rows for which accept(row) is True are considered.
+    '''
+    freqs = noun_index['freqs']
+    lengths = noun_index['lengths']
+    order = noun_index['kd_order']
+    best = []  # max-heap of the k best rows as (-squared distance, row)
+
+    def consider(row):
+        point = kd_point(freqs, lengths, row)
+        distance = sum((w * (q - x))**2
+                       for w, q, x in zip(weights, query, point))
+        if len(best) < k:
+            if accept(row):
+                heapq.heappush(best, (-distance, row))
+        elif distance < -best[0][0] and accept(row):
+            heapq.heapreplace(best, (-distance, row))
+
+    # Ranges still to visit, with a lower bound of the squared distance
+    # of their rows to the query (the distance to the split plane)
+    stack = [(0, len(order), 0, 0.0)]
+    while stack:
+        low, high, dim, bound = stack.pop()
+        if low >= high or (len(best) == k and bound >= -best[0][0]):
+            continue
+        if high - low <= KD_LEAF_SIZE:
+            for i in range(low, high):
+                consider(order[i])
+            continue
+        middle = (low + high) // 2
+        row = order[middle]
+        consider(row)
+        diff = weights[dim] * (query[dim] - kd_point(freqs, lengths, row)[dim])
+        if diff < 0:
+            near, far = (low, middle), (middle + 1, high)
+        else:
+            near, far = (middle + 1, high), (low, middle)
+        # The near side is visited first
+        stack.append((far[0], far[1], 1 - dim, max(bound, diff**2)))
+        stack.append((near[0], near[1], 1 - dim, bound))
+    return sorted((math.sqrt(-distance), row) for distance, row in best)
+
+def build_verb_index(verb_dict, datafile):
+    '''
+    Writes the verb dictionary (as returned by read_verbs in
+    german_noun_frequency_tool.py) to the index file of the data file.
+    Returns the attached index.
+    '''
+    verbs = sorted(verb_dict)
+    pair_offsets = array('I', [0])
+    nouns = []
+    counts = array('I')
+    scores = {measure: array('d') for measure in ASSOCIATION_MEASURES}
+    for verb in verbs:
+        for (noun, bigram_count, *pair_scores) in verb_dict[verb]:
+            nouns.append(noun)
+            counts.append(int(bigram_count))
+            for measure, score in zip(ASSOCIATION_MEASURES, pair_scores):
+                scores[measure].append(math.nan if score is None else score)
+        pair_offsets.append(len(nouns))
+    verb_names, verb_offsets = pack_strings(verbs)
+    noun_names, noun_offsets = pack_strings(nouns)
+    sections = {'verb_names': verb_names, 'verb_offsets': verb_offsets,
+                'pair_offsets': pair_offsets, 'counts': counts,
+                'noun_names': noun_names, 'noun_offsets': noun_offsets}
+    for measure in ASSOCIATION_MEASURES:
+        sections[measure] = scores[measure]
+    return write_index(datafile, VERB_MAGIC, sections,
+                       {'n_verbs': len(verbs), 'n_pairs': len(nouns)})
+
+def attach_verb_index(datafile):
+    '''
+    Maps the verb index of a data file read-only into memory.
+    Returns None if there is no up-to-date index of the data file.
+    '''
+    indexfile = find_index(datafile, VERB_MAGIC)
+    if indexfile is None:
+        return None
+    return attach_index(indexfile, VERB_MAGIC)
+
+def find_verb(verb_index, verb):
+    '''
+    Returns the row of a verb in the verb index (binary search over the
+    alphabetically sorted verbs), or None if the verb is not present
+    '''
+    names = verb_index['verb_names']
+    offsets = verb_index['verb_offsets']
+    low = 0
+    high = verb_index['meta']['n_verbs']
+    while low < high:
+        middle = (low + high) // 2
+        if string_at(names, offsets, middle) < verb:
+            low = middle + 1
+        else:
+            high = middle
+    if low < verb_index['meta']['n_verbs'] and \
+       string_at(names, offsets, low) == verb:
+        return low
+    return None
+
+def verb_pairs(verb_index, verb):
+    '''
+    Returns the (noun, bigram count, pmi, logdice, g2) entries of a verb
+    in file order, or None if the verb is not present in the verb index
+    (missing association scores are returned as None)
+    '''
+    row = find_verb(verb_index, verb)
+    if row is None:
+        return None
+    pair_offsets = verb_index['pair_offsets']
+    counts = verb_index['counts']
+    pairs = []
+    for i in range(pair_offsets[row], pair_offsets[row+1]):
+        noun = string_at(verb_index['noun_names'],
+                         verb_index['noun_offsets'], i)
+        pair_scores = [verb_index[measure][i]
+                       for measure in ASSOCIATION_MEASURES]
+        pairs.append((noun, counts[i]) + tuple(
+            None if math.isnan(score) else score for score in pair_scores))
+    return pairs
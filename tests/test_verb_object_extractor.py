@@ -0,0 +1,66 @@
+'''
+Checks the verb-object extraction on the small CoNLL files in tests/data.
+
+USAGE: python -m unittest discover tests
+
+'''
+
+import os
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from verb_object_extractor import get_verb_objects
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data')
+
+
+def extract(filename, **kwargs):
+    '''
+    Runs the extraction on a fixture and returns the lines of the output
+    '''
+    with tempfile.TemporaryDirectory() as tmpdir:
+        outfilename = os.path.join(tmpdir, 'pairs.tsv')
+        found = get_verb_objects(os.path.join(DATA_DIR, filename),
+                                 outfilename, **kwargs)
+        with open(outfilename, 'r', encoding='utf-8') as F:
+            lines = [line.rstrip('\n').split('\t') for line in F]
+    assert found == len(lines)
+    return lines
+
+
+class VerbObjectExtractorTest(unittest.TestCase):
+
+    # OA objects of full verbs, with the separated particle reattached
+    # ('schlägt ... auf') and the predicted columns used where the gold
+    # columns are empty ('frisst ... Brot'); the subject 'Hund' and the
+    # object of the auxiliary 'hat' are not counted
+    expected_conll = [['2', 'Buch', 'NOUN', 'lesen', 'VERB'],
+                      ['1', 'Brot', 'NOUN', 'fressen', 'VERB'],
+                      ['1', 'Buch', 'NOUN', 'aufschlagen', 'VERB']]
+
+    expected_conllu = [['1', 'Brot', 'NOUN', 'bringen', 'VERB'],
+                       ['1', 'Buch', 'NOUN', 'aufschlagen', 'VERB']]
+
+    def test_conll09(self):
+        lines = extract('verb_objects.conll', processes=1, min_count=1)
+        self.assertEqual(lines, self.expected_conll)
+
+    def test_conll09_parallel_with_spills(self):
+        # max_pairs=0 spills the counts and the sorted pairs after each batch
+        lines = extract('verb_objects.conll', processes=2, batch_size=1,
+                        max_pairs=0, min_count=1)
+        self.assertEqual(lines, self.expected_conll)
+
+    def test_min_count(self):
+        lines = extract('verb_objects.conll', processes=1, min_count=2)
+        self.assertEqual(lines, self.expected_conll[:1])
+
+    def test_conllu(self):
+        lines = extract('verb_objects.conllu', processes=1, min_count=1)
+        self.assertEqual(lines, self.expected_conllu)
+
+
+if __name__ == '__main__':
+    unittest.main()
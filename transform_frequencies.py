@@ -8,7 +8,15 @@ German frequency list (downloaded from
 https://wacky.sslmit.unibo.it/doku.php?id=frequency_lists)
 to frequencies per one million tokens
 
-USAGE: python transform_frequencies.py
+USAGE: python transform_frequencies.py [<inputfile> <outputfile>]
+
+By default, the deWaC unigram list (sorted.de.word.unigrams.utf8) is
+transformed to deWaC_freqlist.tsv. Frequency lists for further corpora
+(e.g. SdeWaC_freqlist.tsv, see CORPORA in german_noun_frequency_tool.py)
+are created by passing their unigram list (one '<count> <word>' entry per
+line) and the output filename.
+The unigram list may be compressed (gzip, bzip2, xz or zstd); by default,
+sorted.de.word.unigrams.utf8.gz (etc.) is read if the plain list is absent.
 
 # Extension 25 August 2021:
 Exclude nouns with a frequency per million of 0.00 to make the list smaller
@@ -19,12 +27,14 @@ the output for gender, number and case (one line per possible analysis)
 
 '''
 
+import sys
 from demorphy import Analyzer
+from corpus_io import open_corpus, find_corpus
 
 def get_total(filename):
     '''Get the total token count'''
     print('Starting total token occurrence count...')
-    with open(filename, 'r', encoding='utf8') as F:
+    with open_corpus(filename) as F:
         total = 0
         for line in F:
             line=line.split()
@@ -61,7 +71,7 @@ def transform_freqs(inputfilename, outputfilename, total):
     '''
     print('Extracting nouns and their raw frequencies...')
     keep = []
-    with open(inputfilename, 'r', encoding='utf8') as F:
+    with open_corpus(inputfilename) as F:
         for line in F:
             line=line.split()
             if len(line) > 1:
@@ -118,8 +128,18 @@ def transform_freqs(inputfilename, outputfilename, total):
 
 if __name__ == '__main__':
 
-    total = get_total('sorted.de.word.unigrams.utf8')
+    inputfilename = find_corpus('sorted.de.word.unigrams.utf8')
+    outputfilename = 'deWaC_freqlist.tsv'
+    if len(sys.argv) == 3:
+        inputfilename = sys.argv[1]
+        outputfilename = sys.argv[2]
+    elif len(sys.argv) != 1:
+        print('\nUSAGE: python transform_frequencies.py '
+              '[<inputfile> <outputfile>]\n')
+        sys.exit()
+
+    total = get_total(inputfilename)
 
     demorphyAnalyzer = Analyzer(char_subs_allowed=True)
 
-    transform_freqs('sorted.de.word.unigrams.utf8', 'deWaC_freqlist.tsv', total)
+    transform_freqs(inputfilename, outputfilename, total)
@@ -0,0 +1,308 @@
+'''
+18 October 2026
+
+This script extracts verb-object pairs from a dependency-parsed corpus in
+CoNLL format (e.g. SdeWaC), as an alternative to the NOUN-VERB bigrams
+of bigram_extractor.py: unlike adjacent bigrams, the pairs only contain
+nouns that are actually the (accusative) object of the verb.
+
+A pair is counted for every noun (POS tag NN) with the dependency label
+OA (accusative object) whose head is a full verb (POS tag VV*). Separated
+verb particles (label SVP) are reattached to the verb lemma, so that e.g.
+'schlägt ... auf' is counted for 'aufschlagen'. In Universal Dependencies
+(CoNLL-U) files, the labels obj and compound:prt and the universal POS
+tags NOUN and VERB are used instead.
+
+The corpus is read in a single pass. Sentences are sent in batches to
+worker processes which count the pairs; the counts are merged in the main
+process and spilled to sorted temporary files whenever more than
+max_pairs distinct pairs are held in memory. The merged pairs are sorted
+by count in the same way (in runs of at most max_pairs pairs) and streamed
+to the output file, so the memory use grows neither with the size of the
+corpus nor with the number of distinct pairs.
+
+The output has the same format as the NOUN-VERB bigram file
+(count, noun, NOUN, verb, VERB; sorted by decreasing count), so it can
+directly replace bigrams_noun_verb_freq2+.tsv for the verb frame search
+in german_noun_frequency_tool.py (see BIGRAM_FILE).
+
+USAGE: python verb_object_extractor.py <parsedcorpus> [<outputfile>]
+
+Both CoNLL-2009 (12 or more columns, as used for SdeWaC) and
+CoNLL-X/CoNLL-U (10 columns) files are supported; the format is detected
+from the number of columns. The corpus may be compressed (gzip, bzip2, xz
+or zstd). Small CoNLL files for a quick check are in tests/data; the
+expected pairs are checked with: python -m unittest discover tests
+
+'''
+
+import heapq
+import os
+import sys
+import tempfile
+from collections import Counter, deque
+from multiprocessing import Pool
+from corpus_io import open_corpus
+
+
+# Column indices per CoNLL format: for each field, the column of the gold
+# annotation and the column of the predicted annotation (used if the gold
+# column is empty, as in parser output)
+CONLL_COLUMNS = {
+    'conll09': {'lemma': (2, 3), 'pos': (4, 5),
+                'head': (8, 9), 'deprel': (10, 11)},
+    'conllx': {'lemma': (2, 2), 'pos': (4, 3),
+               'head': (6, 6), 'deprel': (7, 7)},   # also CoNLL-U
+}
+# Labels and POS tags per CoNLL format: TIGER labels with STTS tags, and
+# for 10-column files also the Universal Dependencies labels with the
+# universal POS tags (used if a CoNLL-U file has no STTS tags)
+CONLL_LABELS = {
+    'conll09': {'object': {'OA'}, 'particle': {'SVP'},
+                'noun': {'NN'}, 'verb': ('VV',)},
+    'conllx': {'object': {'OA', 'obj'}, 'particle': {'SVP', 'compound:prt'},
+               'noun': {'NN', 'NOUN'}, 'verb': ('VV', 'VERB')},
+}
+EMPTY_VALUES = {'_', '<unknown>', ''}
+
+
+def get_field(fields, columns, field):
+    '''
+    Returns a field of a token, falling back to the predicted annotation
+    if the gold annotation is empty
+    '''
+    gold, predicted = columns[field]
+    value = fields[gold]
+    if value in EMPTY_VALUES and predicted < len(fields):
+        value = fields[predicted]
+    return value
+
+def extract_pairs(sentence):
+    '''
+    Extracts the (verb lemma, object noun lemma) pairs of a sentence
+    (given as a list of CoNLL lines)
+    '''
+    tokens = [line.rstrip('\n').split('\t') for line in sentence]
+    if len(tokens[0]) >= 12:
+        conll_format = 'conll09'
+    elif len(tokens[0]) >= 8:
+        conll_format = 'conllx'
+    else:
+        return []
+    columns = CONLL_COLUMNS[conll_format]
+    labels = CONLL_LABELS[conll_format]
+    by_id = dict()
+    particles = dict()  # verb token id -> separated particle
+    for fields in tokens:
+        if len(fields) != len(tokens[0]):
+            continue
+        if '-' in fields[0] or '.' in fields[0]:
+            continue  # CoNLL-U multiword tokens and empty nodes
+        by_id[fields[0]] = fields
+        if get_field(fields, columns, 'deprel') in labels['particle']:
+            particles[get_field(fields, columns, 'head')] = \
+                get_field(fields, columns, 'lemma').lower()
+    pairs = []
+    for fields in by_id.values():
+        if get_field(fields, columns, 'deprel') not in labels['object']:
+            continue
+        if get_field(fields, columns, 'pos') not in labels['noun']:
+            continue
+        head_id = get_field(fields, columns, 'head')
+        head = by_id.get(head_id)
+        if head is None:
+            continue
+        if not get_field(head, columns, 'pos').startswith(labels['verb']):
+            continue
+        noun = get_field(fields, columns, 'lemma')
+        verb = get_field(head, columns, 'lemma').lower()
+        if noun in EMPTY_VALUES or verb in EMPTY_VALUES:
+            continue
+        verb = particles.get(head_id, '') + verb
+        pairs.append((verb, noun))
+    return pairs
+
+def count_pairs(sentences):
+    '''
+    Counts the verb-object pairs in a batch of sentences
+    (run in the worker processes)
+    '''
+    counts = Counter()
+    for sentence in sentences:
+        counts.update(extract_pairs(sentence))
+    return counts
+
+def read_sentences(filename, batch_size):
+    '''
+    Streams a CoNLL file and yields batches of sentences
+    (each sentence is a list of token lines)
+    '''
+    batch = []
+    sentence = []
+    with open_corpus(filename) as F:
+        for line in F:
+            if line.strip() == '':
+                if sentence:
+                    batch.append(sentence)
+                    sentence = []
+                    if len(batch) == batch_size:
+                        yield batch
+                        batch = []
+            elif not line.startswith('#'):  # skip CoNLL-U comments
+                sentence.append(line)
+    if sentence:
+        batch.append(sentence)
+    if batch:
+        yield batch
+
+def spill_counts(counts, tmpdir, runs):
+    '''
+    Writes the counts, sorted by pair, to a temporary run file
+    '''
+    filename = os.path.join(tmpdir, 'run{}.tsv'.format(len(runs)))
+    with open(filename, 'w', encoding='utf-8') as F:
+        for (verb, noun) in sorted(counts):
+            F.write('{}\t{}\t{}\n'.format(verb, noun, counts[(verb, noun)]))
+    runs.append(filename)
+    return
+
+def read_run(filename):
+    '''
+    Yields the ((verb, noun), count) entries of a run file
+    '''
+    with open(filename, 'r', encoding='utf-8') as F:
+        for line in F:
+            verb, noun, count = line.rstrip('\n').split('\t')
+            yield (verb, noun), int(count)
+
+def merge_runs(runs, counts):
+    '''
+    Merges the sorted run files and the remaining in-memory counts,
+    yielding each pair once with its total count
+    '''
+    streams = [read_run(filename) for filename in runs]
+    streams.append(iter(sorted(counts.items())))
+    current = None
+    total = 0
+    for pair, count in heapq.merge(*streams, key=lambda entry: entry[0]):
+        if pair != current:
+            if current is not None:
+                yield current, total
+            current = pair
+            total = 0
+        total += count
+    if current is not None:
+        yield current, total
+
+def pair_order(pair):
+    '''
+    Sort key of the output: decreasing count, then noun and verb
+    '''
+    return (-pair[0], pair[1], pair[3])
+
+def spill_pairs(pairs, tmpdir, runs):
+    '''
+    Writes (count, noun, 'NOUN', verb, 'VERB') tuples, sorted by decreasing
+    count, to a temporary run file
+    '''
+    filename = os.path.join(tmpdir, 'sorted{}.tsv'.format(len(runs)))
+    pairs.sort(key=pair_order)
+    with open(filename, 'w', encoding='utf-8') as F:
+        for pair in pairs:
+            F.write('\t'.join(str(el) for el in pair) + '\n')
+    runs.append(filename)
+    return
+
+def read_pairs(filename):
+    '''
+    Yields the (count, noun, 'NOUN', verb, 'VERB') tuples of a sorted run file
+    '''
+    with open(filename, 'r', encoding='utf-8') as F:
+        for line in F:
+            count, noun, noun_pos, verb, verb_pos = \
+                line.rstrip('\n').split('\t')
+            yield int(count), noun, noun_pos, verb, verb_pos
+
+def get_verb_objects(filename, outfilename, processes=None, batch_size=10000,
+                     max_pairs=5000000, min_count=2):
+    '''
+    Extracts the verb-object pairs from a parsed corpus and writes all pairs
+    occurring at least min_count times to the output file, as
+    (count, noun, 'NOUN', verb, 'VERB') lines sorted by decreasing count.
+    With processes=1, everything runs in the main process.
+    Returns the number of pairs written.
+    '''
+    if processes is None:
+        processes = os.cpu_count() or 1
+    print('Starting verb-object extraction ({} processes)...'\
+          .format(processes))
+    counts = Counter()
+    runs = []
+    with tempfile.TemporaryDirectory() as tmpdir:
+
+        def add_counts(batch_counts):
+            counts.update(batch_counts)
+            if len(counts) > max_pairs:
+                spill_counts(counts, tmpdir, runs)
+                counts.clear()
+
+        i = 0
+        if processes == 1:
+            for batch in read_sentences(filename, batch_size):
+                add_counts(count_pairs(batch))
+                i += len(batch)
+                print(' Progress: processed {} sentences'.format(i), end='\r')
+        else:
+            with Pool(processes) as pool:
+                # Keep a bounded number of batches in flight
+                pending = deque()
+                for batch in read_sentences(filename, batch_size):
+                    pending.append(pool.apply_async(count_pairs, (batch,)))
+                    i += len(batch)
+                    if len(pending) >= 2 * processes:
+                        add_counts(pending.popleft().get())
+                        print(' Progress: processed {} sentences'.format(i),
+                              end='\r')
+                while pending:
+                    add_counts(pending.popleft().get())
+
+        print('\n\nProcessed all {} sentences.'.format(i))
+
+        # Sort the merged pairs by count in runs of at most max_pairs pairs
+        pairs = []
+        sorted_runs = []
+        for (verb, noun), count in merge_runs(runs, counts):
+            if count >= min_count:
+                pairs.append((count, noun, 'NOUN', verb, 'VERB'))
+                if len(pairs) > max_pairs:
+                    spill_pairs(pairs, tmpdir, sorted_runs)
+                    pairs = []
+        counts.clear()
+        pairs.sort(key=pair_order)
+
+        print('\nWriting verb-object pairs to file (filename: {})'\
+              .format(outfilename))
+        found = 0
+        streams = [read_pairs(run) for run in sorted_runs]
+        streams.append(iter(pairs))
+        with open(outfilename, 'w', encoding='utf8') as output:
+            for pair in heapq.merge(*streams, key=pair_order):
+                output.write('\t'.join(str(el) for el in pair) + '\n')
+                found += 1
+    print('\nFound {} verb-object pairs.\n'.format(found))
+    return found
+
+if __name__ == '__main__':
+
+    # Check presence of command line arguments
+    if len(sys.argv) not in (2, 3):
+        print('\nUSAGE: python verb_object_extractor.py <parsedcorpus> '
+              '[<outputfile>]\n')
+        sys.exit()
+    filename = sys.argv[1]
+    outfilename = 'verb_objects_freq2+.tsv'
+    if len(sys.argv) == 3:
+        outfilename = sys.argv[2]
+
+    # Extract pairs that occur at least twice (as in the bigram file)
+    get_verb_objects(filename, outfilename, min_count=2)